@@ -1,16 +1,46 @@
 """
-A Python library for making resized thumbnails and detect fire and 
+A Python library for making resized thumbnails and detect fire and
 smoke from video.
 
+The fire/smoke detector pulls in torch and YOLOv5, so it and the modules built on it are
+imported on first use rather than with the package.
+
 """
 
+import importlib
+
 from video_toolpkg.thumbnail_maker import ThumbnailMaker
-from video_toolpkg.fire_smoke_detector import FireSmokeDetector
+from video_toolpkg.inference_cache import InferenceCache
+from video_toolpkg.profiling import StageProfiler
 
 extract_thumbnail = ThumbnailMaker.extract_thumbnail
 play_src = ThumbnailMaker.play_src
 
-detect_fire_from_read = FireSmokeDetector.detect_fire_from_read
-detect_fire_from_path = FireSmokeDetector.detect_fire_from_path
-detect_smoke_from_read = FireSmokeDetector.detect_smoke_from_read
-detect_smoke_from_path = FireSmokeDetector.detect_smoke_from_paths
\ No newline at end of file
+# name -> (module, attribute) loaded on first access
+_LAZY_ATTRS = {
+    'FireSmokeDetector': ('video_toolpkg.fire_smoke_detector', 'FireSmokeDetector'),
+    'CatalogScanner': ('video_toolpkg.catalog_scan', 'CatalogScanner'),
+    'StreamMonitor': ('video_toolpkg.stream_monitor', 'StreamMonitor'),
+    'detect_fire_from_read': ('video_toolpkg.fire_smoke_detector', 'FireSmokeDetector.detect_fire_from_read'),
+    'detect_fire_from_path': ('video_toolpkg.fire_smoke_detector', 'FireSmokeDetector.detect_fire_from_path'),
+    'detect_smoke_from_read': ('video_toolpkg.fire_smoke_detector', 'FireSmokeDetector.detect_smoke_from_read'),
+    'detect_smoke_from_path': ('video_toolpkg.fire_smoke_detector', 'FireSmokeDetector.detect_smoke_from_path'),
+    'detect_all_from_read': ('video_toolpkg.fire_smoke_detector', 'FireSmokeDetector.detect_all_from_read'),
+    'detect_all_from_path': ('video_toolpkg.fire_smoke_detector', 'FireSmokeDetector.detect_all_from_path'),
+}
+
+
+def __getattr__(name):
+    """Import the heavy attributes of the package on first access (PEP 562)"""
+    if name not in _LAZY_ATTRS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, attr = _LAZY_ATTRS[name]
+    value = importlib.import_module(module)
+    for part in attr.split('.'):
+        value = getattr(value, part)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_ATTRS))
@@ -0,0 +1,162 @@
+"""Benchmark
+    A module for measuring the speed and memory of :class:`FireSmokeDetector` without trained weights or footage,
+    using synthetic videos and a randomly initialised model
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from video_toolpkg.fire_smoke_detector import FireSmokeDetector
+from video_toolpkg.profiling import StageProfiler
+from models.yolo import Model  # importable once the detector added yolov5 to sys.path
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_video(des_path: str, width=1280, height=720, n_frames=300, fps=30) -> str:
+    """Write a synthetic video of moving shapes over noise with ``cv2.VideoWriter``
+
+    Args:
+        des_path (str): save path of the video, an ``.mp4`` or ``.avi`` file
+        width (int, optional): frame width, 1280 by default
+        height (int, optional): frame height, 720 by default
+        n_frames (int, optional): number of frames, 300 by default
+        fps (int, optional): frame rate, 30 by default
+
+    Returns:
+        str: save path of the video
+    """
+    fourcc = cv2.VideoWriter_fourcc(*('mp4v' if des_path.lower().endswith('.mp4') else 'MJPG'))
+    writer = cv2.VideoWriter(des_path, fourcc, fps, (width, height))
+    if not writer.isOpened():
+        raise ValueError(f'cannot write video {os.path.abspath(des_path)}')
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    for i in range(n_frames):
+        img = background.copy()
+        x = int((width - 1) * (0.5 + 0.4 * np.sin(i / 20)))
+        y = int((height - 1) * (0.5 + 0.4 * np.cos(i / 30)))
+        cv2.circle(img, (x, y), min(width, height) // 8, (0, 128, 255), -1)  # an orange blob
+        left = i * 7 % width
+        cv2.rectangle(img, (left, height // 3), (left + width // 10, height // 2), (128, 128, 128), -1)  # a grey bar
+        writer.write(img)
+    writer.release()
+    return des_path
+
+
+def make_model(des_path: str, cfg='') -> str:
+    """Save a randomly initialised fire/smoke model loadable by :class:`FireSmokeDetector`
+
+    Args:
+        des_path (str): save path of the ``*.pt`` model
+        cfg (str, optional): YOLOv5 model yaml, ``yolov5/models/yolov5s_fs.yaml`` by default
+
+    Returns:
+        str: save path of the model
+    """
+    torch.manual_seed(0)
+    with torch.no_grad():  # Model initializes the Detect biases in place, which autograd rejects on recent torch
+        model = Model(cfg or os.path.join(current_dir, 'yolov5', 'models', 'yolov5s_fs.yaml'), ch=3, nc=2)
+    model.names = ['fire', 'smoke']
+    torch.save({'model': model}, des_path)
+    return des_path
+
+
+def run_benchmark(weights: str, video: str, batch_sizes=(1,), imgszs=(640,), threads=(0,), device='cpu',
+                  trusted=False) -> list:
+    """Scan a video once with every combination of settings, each in a fresh process
+
+    Notes:
+        Running each case in its own process keeps the peak RSS and the torch thread count of cases apart
+
+    Args:
+        weights (str): path of the model, see :func:`make_model`
+        video (str): path of the video, see :func:`make_video`
+        batch_sizes (tuple[int], optional): values of ``batch_size`` to measure, (1,) by default
+        imgszs (tuple[int], optional): values of ``imgsz`` to measure, (640,) by default
+        threads (tuple[int], optional): numbers of torch threads to measure, (0,) (torch default) by default
+        device (str, optional): device to run on, 'cpu' by default
+        trusted (bool, optional): let the worker processes unpickle every object of ``weights``, which torch 2.6
+            and later refuse by default for the whole models saved by YOLOv5. Only set it for models you made,
+            such as those of :func:`make_model`. False by default
+
+    Returns:
+        list[dict]: the settings, 'frames', 'fps', mean 'latency_ms' per frame, 'peak_rss_mb'
+        and per-stage latencies in 'stages' of each case
+    """
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for batch_size, imgsz, n_threads in itertools.product(batch_sizes, imgszs, threads):
+        with context.Pool(1) as pool:
+            results.append(pool.apply(_bench_case, (weights, video, batch_size, imgsz, n_threads, device, trusted)))
+    return results
+
+
+def _bench_case(weights, video, batch_size, imgsz, threads, device, trusted=False) -> dict:
+    """Measure a single case in a worker process"""
+    if trusted:
+        os.environ['TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD'] = '1'  # only seen by this worker process
+    detector = FireSmokeDetector(weights=weights, device=device, threads=threads, imgsz=imgsz)
+    detector.batch_size = batch_size
+    detector.percent_from_path(video, stop=max(batch_size, 2))  # warm up
+    detector.profiler = StageProfiler()
+
+    t = time.time()
+    n_frames = len(detector.percent_from_path(video))
+    elapsed = time.time() - t
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)  # bytes on macOS, KiB on Linux
+    stages = {stage: {k: v for k, v in stats.items() if k.endswith('_ms')}
+              for stage, stats in detector.profiler.summary()['stages'].items()}
+    return {'batch_size': batch_size, 'imgsz': imgsz, 'threads': threads or torch.get_num_threads(),
+            'device': device, 'frames': n_frames, 'fps': n_frames / elapsed, 'latency_ms': elapsed * 1000 / n_frames,
+            'peak_rss_mb': peak_rss_mb, 'stages': stages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FireSmokeDetector on a synthetic video and model')
+    parser.add_argument('--weights', type=str, default='', help='model to benchmark, a random model by default')
+    parser.add_argument('--cfg', type=str, default='', help='yaml of the random model, yolov5s_fs.yaml by default')
+    parser.add_argument('--width', type=int, default=1280, help='width of the synthetic video')
+    parser.add_argument('--height', type=int, default=720, help='height of the synthetic video')
+    parser.add_argument('--frames', type=int, default=300, help='number of frames of the synthetic video')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8], help='batch sizes')
+    parser.add_argument('--img-sizes', type=int, nargs='+', default=[640], help='inference image sizes')
+    parser.add_argument('--threads', type=int, nargs='+', default=[0], help='torch thread counts, 0 for default')
+    parser.add_argument('--device', type=str, default='cpu', help='cuda device, i.e. 0 or cpu')
+    parser.add_argument('--output', type=str, default='benchmark.json', help='JSON file to write results to')
+    opt = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        weights = opt.weights or make_model(os.path.join(tmp_dir, 'random.pt'), opt.cfg)
+        video = make_video(os.path.join(tmp_dir, 'synthetic.mp4'), opt.width, opt.height, opt.frames)
+        results = run_benchmark(weights, video, opt.batch_sizes, opt.img_sizes, opt.threads, opt.device,
+                                trusted=not opt.weights)  # the random model was made above
+
+    report = {'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+              'torch': torch.__version__, 'opencv': cv2.__version__, 'machine': platform.machine(),
+              'cpu_count': os.cpu_count(), 'video': {'width': opt.width, 'height': opt.height, 'frames': opt.frames},
+              'weights': opt.weights or f'random {opt.cfg or "yolov5s_fs.yaml"}', 'results': results}
+    with open(opt.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    for r in results:
+        print(f"batch {r['batch_size']:>3} imgsz {r['imgsz']:>4} threads {r['threads']:>3}: {r['fps']:7.1f} FPS, "
+              f"{r['latency_ms']:7.1f} ms/frame, {r['peak_rss_mb']:7.0f} MB peak RSS")
+    print(f'results saved to {opt.output}')
+
+
+if __name__ == '__main__':
+    main()
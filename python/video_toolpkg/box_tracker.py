@@ -0,0 +1,42 @@
+"""BoxTracker
+    A module for carrying fire and smoke boxes from one frame to the next with template matching,
+    used by :meth:`FireSmokeDetector.boxes_from_path` between keyframes
+"""
+
+import cv2
+import numpy as np
+
+
+def track_boxes(prev_gray, gray, boxes, min_score=0.6, search=0.5):
+    """Move boxes of the previous frame to where their content best matches in the current frame
+
+    Notes:
+        The crop of each box in ``prev_gray`` is searched with normalized cross-correlation in a window around
+        the box grown by ``search`` times its larger side. Boxes keep their size, confidence and class
+
+    Args:
+        prev_gray (np.ndarray): grayscale previous frame
+        gray (np.ndarray): grayscale current frame of the same size
+        boxes (np.ndarray): (n_boxes, 6) boxes of the previous frame, see :meth:`FireSmokeDetector.boxes_from_read`
+        min_score (float, optional): lowest correlation accepted for a box, 0.6 by default
+        search (float, optional): margin of the search window relative to the box size, 0.5 by default
+
+    Returns:
+        np.ndarray or None: the boxes in the current frame, or None if any box could not be tracked
+        with a correlation of at least ``min_score``
+    """
+    height, width = gray.shape[:2]
+    tracked = boxes.copy()
+    for box in tracked:
+        x1, y1, x2, y2 = np.clip(box[:4].round().astype(int), 0, [width, height, width, height])
+        if x2 - x1 < 4 or y2 - y1 < 4:
+            return None  # too small or outside of the frame to match reliably
+        margin = int(max(x2 - x1, y2 - y1) * search)
+        wx1, wy1 = max(x1 - margin, 0), max(y1 - margin, 0)
+        wx2, wy2 = min(x2 + margin, width), min(y2 + margin, height)
+        scores = cv2.matchTemplate(gray[wy1:wy2, wx1:wx2], prev_gray[y1:y2, x1:x2], cv2.TM_CCOEFF_NORMED)
+        _, score, _, (dx, dy) = cv2.minMaxLoc(scores)
+        if not score >= min_score:  # also rejects NaN of flat crops
+            return None
+        box[:4] += (wx1 + dx - x1, wy1 + dy - y1) * 2
+    return tracked
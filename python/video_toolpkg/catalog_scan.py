@@ -0,0 +1,261 @@
+"""CatalogScanner
+    A module for scanning a catalog of image and video files for fire and smoke,
+    given as a directory, a glob pattern or a manifest file listing one path per line
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import torch
+
+from video_toolpkg.fire_smoke_detector import _SHARD_SETTINGS, _init_shard_worker, _worker_detector, frame_count
+from utils.datasets import img_formats, vid_formats  # importable once the detector added yolov5 to sys.path
+
+
+def catalog_files(source: str) -> list:
+    """Return the image and video files of a catalog
+
+    Args:
+        source (str): a directory (searched recursively), a glob pattern, a single image or video file,
+            or a manifest file listing one path per line. Blank lines and lines starting with '#' are ignored
+            and relative paths are resolved against the directory of the manifest
+
+    Returns:
+        list[str]: absolute paths of the image and video files in the catalog
+
+    Raises:
+        TypeError: if data type of ``source`` is incorrect
+        FileNotFoundError: if ``source`` is not exists
+    """
+    if type(source) is not str:
+        raise TypeError(f"'{source}' is not str but {type(source)}")
+    if '*' in source:
+        files = sorted(glob.glob(source, recursive=True))
+    elif os.path.isdir(source):
+        files = sorted(os.path.join(root, f) for root, _, names in os.walk(source) for f in names)
+    elif os.path.isfile(source):
+        if os.path.splitext(source)[-1].lower() in img_formats + vid_formats:
+            files = [source]
+        else:
+            base = os.path.dirname(os.path.abspath(source))
+            with open(source, 'r') as f:
+                lines = [x.strip() for x in f.read().splitlines()]
+            files = [os.path.join(base, x) for x in lines if x and not x.startswith('#')]
+    else:
+        raise FileNotFoundError(f"{os.path.abspath(source)} does not exist")
+    return [os.path.abspath(f) for f in files if os.path.splitext(f)[-1].lower() in img_formats + vid_formats]
+
+
+class CatalogScanner:
+    """:class:`CatalogScanner` scans a catalog of files in worker processes that keep the model loaded
+    and streams the results to a JSON lines file
+
+    Each line of the results file holds the 'path' and number of 'frames' of a file and the list of frames
+    determined to contain each class of the model, or an 'error' message if the file could not be scanned.
+    Files already listed in the results file are skipped, so an interrupted scan resumes where it stopped.
+    With ``retry_errors``, a file may be listed more than once and its last record holds the result.
+
+    Args:
+        results_path (str): path of the JSON lines file results are appended to
+        workers (int, optional): number of worker processes, 1 by default
+        threads (int, optional): number of torch threads in each worker, 0 (torch default) by default
+        group_frames (int, optional): files shorter than this are scanned together in groups of about
+            this many frames so that their frames share batches, 256 by default
+        settings (dict, optional): :class:`FireSmokeDetector` settings used by the workers,
+            such as ``batch_size`` or ``f_threshold``
+        weights (str, optional): path of the trained model, ``FIRE_SMOKE_WEIGHTS`` or ``DEFAULT_WEIGHTS`` by default
+        device (str, optional): 'cpu' or a CUDA device such as '0' used by every worker,
+            CUDA device 0 if available by default
+        retry_errors (bool, optional): scan again the files whose last record is an error, False by default
+
+    """
+    def __init__(self, results_path: str, workers=1, threads=0, group_frames=256, settings=None, weights='',
+                 device='', retry_errors=False):
+        """Initialize the :class:`CatalogScanner` object."""
+        for value in (results_path, weights, device):
+            if type(value) is not str:
+                raise TypeError(f"'{value}' is not str but {type(value)}")
+        for name, value in (('workers', workers), ('threads', threads), ('group_frames', group_frames)):
+            if type(value) is not int:
+                raise TypeError(f"'{value}' is not int but {type(value)}")
+            if value < (0 if name == 'threads' else 1):
+                raise ValueError(f"{name} is out of range: {value}")
+        settings = dict(settings or {})
+        unknown = set(settings) - set(_SHARD_SETTINGS)
+        if unknown:
+            raise ValueError(f"unknown detector settings: {sorted(unknown)}")
+
+        self._results_path = results_path
+        self._init_args = {'weights': os.path.abspath(weights) if weights else '', 'device': device}
+        self._workers = workers
+        self._threads = threads
+        self._group_frames = group_frames
+        self._settings = settings
+        self._retry_errors = bool(retry_errors)
+
+    @property
+    def results_path(self) -> str:
+        """str: Path of the JSON lines file results are appended to"""
+        return self._results_path
+
+    def done(self) -> set:
+        """Return the files that already have a result
+
+        Returns:
+            set[str]: absolute paths of the files listed in the results file,
+            without those whose last record is an error if ``retry_errors`` is set
+        """
+        done = set()
+        if not os.path.exists(self._results_path):
+            return done
+        with open(self._results_path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    path = record['path']
+                except (ValueError, KeyError):
+                    continue  # line cut short by an interrupted scan
+                if self._retry_errors and 'error' in record:
+                    done.discard(path)
+                else:
+                    done.add(path)
+        return done
+
+    def scan(self, source: str) -> int:
+        """Scan every file of a catalog that does not have a result yet
+
+        Args:
+            source (str): a directory, glob pattern or manifest file, see :func:`catalog_files`
+
+        Returns:
+            int: number of files scanned by this call
+        """
+        self.__trim_partial_line()  # before reading, in case the cut record happens to be valid JSON
+        done = self.done()
+        files = [f for f in catalog_files(source) if f not in done]
+        if not files:
+            return 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self._results_path)), exist_ok=True)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self._workers, mp_context=context, initializer=_init_shard_worker,
+                                 initargs=(self._threads, self._init_args)) as pool, \
+                open(self._results_path, 'a') as results:
+            # videos are opened by the workers, which scan long ones right away and send back the frame count
+            # of short ones, so that groups of short files are submitted as soon as they are formed
+            tasks, probes = set(), set()
+            group, frames = [], 0
+            for f in files:
+                if os.path.splitext(f)[-1].lower() in img_formats:
+                    group.append(f)
+                    frames += 1
+                else:
+                    probes.add(pool.submit(_scan_unless_short, self._settings, f, self._group_frames))
+                if frames >= self._group_frames:
+                    tasks.add(pool.submit(_scan_group, self._settings, group))
+                    group, frames = [], 0
+            while tasks or probes or group:
+                if group and (frames >= self._group_frames or not probes):
+                    tasks.add(pool.submit(_scan_group, self._settings, group))
+                    group, frames = [], 0
+                finished, _ = wait(tasks | probes, return_when=FIRST_COMPLETED)
+                for task in finished:
+                    if task in probes:
+                        probes.discard(task)
+                        records, path, count = task.result()
+                        if records is None:
+                            group.append(path)
+                            frames += count
+                            continue
+                    else:
+                        tasks.discard(task)
+                        records = task.result()
+                    for record in records:
+                        results.write(json.dumps(record) + '\n')
+                    results.flush()
+                    os.fsync(results.fileno())  # checkpoint
+        return len(files)
+
+    def __trim_partial_line(self):
+        """Private Method to cut a record left incomplete by an interrupted scan from the end of the results file,
+        so that the next record does not continue it"""
+        if not os.path.exists(self._results_path):
+            return
+        with open(self._results_path, 'rb+') as f:
+            size = end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                step = min(end, 4096)
+                f.seek(end - step)
+                newline = f.read(step).rfind(b'\n')
+                if newline >= 0:
+                    end += newline + 1 - step
+                    break
+                end -= step
+            if end < size:
+                f.truncate(end)
+
+
+def _scan_unless_short(settings, path, group_frames) -> tuple:
+    """Scan a video in a worker process unless it is shorter than ``group_frames``
+
+    Returns:
+        tuple[list | None, str, int]: the result records, or None if the video is short and is left to be
+        scanned with other short files, its path and its number of frames
+    """
+    count = frame_count(path)
+    if count < group_frames:
+        return None, path, count
+    return _scan_group(settings, [path]), path, count
+
+
+def _scan_group(settings, paths) -> list:
+    """Scan a group of files in a worker process and return a result record per file"""
+    detector = _worker_detector(settings)
+    try:
+        with torch.no_grad():
+            if len(paths) == 1:
+                percents_list = [detector.percent_from_path(paths[0])]
+            else:
+                percents_list = detector.percent_from_paths(paths)
+    except Exception as e:
+        if len(paths) > 1:  # rescan one by one to isolate the failing file
+            return [record for path in paths for record in _scan_group(settings, [path])]
+        return [{'path': paths[0], 'error': str(e)}]
+
+    records = []
+    for path, percents in zip(paths, percents_list):
+        record = {'path': path, 'frames': len(percents)}
+        for name in detector.names:
+            record[name] = detector.frames_from_percent(percents, name).tolist()
+        records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scan a catalog of images and videos for fire and smoke')
+    parser.add_argument('source', type=str, help='directory, glob pattern or manifest file')
+    parser.add_argument('--results', type=str, default='results.jsonl', help='JSON lines file to append results to')
+    parser.add_argument('--weights', type=str, default='', help='trained model, FIRE_SMOKE_WEIGHTS by default')
+    parser.add_argument('--device', type=str, default='', help='cuda device, i.e. 0 or cpu')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--threads', type=int, default=0, help='torch threads per worker')
+    parser.add_argument('--batch-size', type=int, default=1, help='frames inferred together')
+    parser.add_argument('--screen-weights', type=str, default='', help='small screening model run before the full one')
+    parser.add_argument('--escalate-threshold', type=int, default=20, help='screening percentage sent to full model')
+    parser.add_argument('--retry-errors', action='store_true', help='scan again files that failed before')
+    opt = parser.parse_args()
+
+    settings = {'batch_size': opt.batch_size}
+    if opt.screen_weights:
+        settings.update(screen_weights=os.path.abspath(opt.screen_weights), escalate_threshold=opt.escalate_threshold)
+    scanner = CatalogScanner(opt.results, weights=opt.weights, device=opt.device, workers=opt.workers,
+                             threads=opt.threads, settings=settings, retry_errors=opt.retry_errors)
+    print(f'{scanner.scan(opt.source)} files scanned, results in {scanner.results_path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""ColorPrefilter
+    A module for measuring the fraction of fire-colored and smoke-colored pixels of a frame,
+    used by :class:`FireSmokeDetector` to skip frames that cannot contain fire or smoke,
+    and for calibrating the floors of those fractions against full inference
+"""
+
+import argparse
+import json
+
+import cv2
+import numpy as np
+
+# HSV ranges in OpenCV units (H 0 - 180): saturated red to yellow for fire, in two bands as red hues wrap around
+# at 180, and bright unsaturated grey for smoke
+FIRE_HSV = (((0, 80, 150), (35, 255, 255)), ((170, 80, 150), (180, 255, 255)))
+SMOKE_HSV = ((0, 0, 80), (180, 60, 230))
+
+
+def color_fractions(img0, size=64) -> tuple:
+    """Return the fractions of fire-colored and smoke-colored pixels of a downsampled BGR image
+
+    Args:
+        img0 (np.ndarray): a BGR image
+        size (int, optional): side of the square the image is downsampled to, 64 by default
+
+    Returns:
+        tuple[float, float]: the fire and smoke fractions, between 0.0 and 1.0
+    """
+    hsv = cv2.cvtColor(cv2.resize(img0, (size, size), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2HSV)
+    fire_mask = cv2.inRange(hsv, *FIRE_HSV[0])
+    for band in FIRE_HSV[1:]:
+        fire_mask |= cv2.inRange(hsv, *band)
+    fire = cv2.countNonZero(fire_mask)
+    smoke = cv2.countNonZero(cv2.inRange(hsv, *SMOKE_HSV))
+    return fire / (size * size), smoke / (size * size)
+
+
+def calibrate(detector, frames: list, fire_floors=(0.0, 0.001, 0.005, 0.01, 0.02, 0.05),
+              smoke_floors=(0.0, 0.01, 0.02, 0.05, 0.1, 0.2)) -> list:
+    """Measure how often each pair of floors would skip frames, and frames with fire or smoke, on a sample set
+
+    Notes:
+        Every frame is inferred by the full model with the prefilter disabled, and a frame counts as positive if
+        any class reaches its threshold. A false skip is a positive frame that the floors would have skipped
+
+    Args:
+        detector (FireSmokeDetector): detector whose model and thresholds are used
+        frames (list[np.ndarray]): BGR sample images, see :func:`~video_toolpkg.quantization.sample_frames`
+        fire_floors (tuple[float], optional): values of ``fire_color_floor`` to evaluate
+        smoke_floors (tuple[float], optional): values of ``smoke_color_floor`` to evaluate
+
+    Returns:
+        list[dict]: 'fire_floor', 'smoke_floor', 'skip_rate' over all frames, 'false_skips'
+        and 'false_skip_rate' over positive frames of each pair, sorted by false skip rate then by skip rate
+    """
+    if not frames:
+        raise ValueError(f"no frames to calibrate on")
+    percents = np.concatenate([detector.percent_from_reads(frames[i:i + 32]) for i in range(0, len(frames), 32)])
+    positive = np.zeros(len(frames), dtype=bool)
+    for name in detector.names:
+        positive[detector.frames_from_percent(percents, name)] = True
+    fractions = np.array([color_fractions(img0) for img0 in frames])
+
+    report = []
+    for fire_floor in fire_floors:
+        for smoke_floor in smoke_floors:
+            skipped = (fractions[:, 0] < fire_floor) & (fractions[:, 1] < smoke_floor)
+            false_skips = int((skipped & positive).sum())
+            report.append({'fire_floor': fire_floor, 'smoke_floor': smoke_floor,
+                           'skip_rate': float(skipped.mean()), 'false_skips': false_skips,
+                           'false_skip_rate': float(false_skips / positive.sum()) if positive.any() else 0.0})
+    return sorted(report, key=lambda r: (r['false_skip_rate'], -r['skip_rate']))
+
+
+def main():
+    from video_toolpkg.fire_smoke_detector import FireSmokeDetector
+    from video_toolpkg.quantization import sample_frames
+
+    parser = argparse.ArgumentParser(description='Calibrate the color prefilter floors against full inference')
+    parser.add_argument('source', type=str, help='directory, glob pattern or manifest of sample footage')
+    parser.add_argument('--weights', type=str, default='', help='trained model, FIRE_SMOKE_WEIGHTS by default')
+    parser.add_argument('--device', type=str, default='', help='cuda device, i.e. 0 or cpu')
+    parser.add_argument('--frames', type=int, default=1000, help='number of sample frames')
+    parser.add_argument('--report', type=str, default='', help='JSON file to write the calibration report to')
+    opt = parser.parse_args()
+
+    frames = sample_frames(opt.source, opt.frames)
+    report = calibrate(FireSmokeDetector(weights=opt.weights, device=opt.device), frames)
+    print(f"{'fire floor':>10} {'smoke floor':>11} {'skip rate':>9} {'false skips':>11} {'false skip rate':>15}")
+    for r in report:
+        print(f"{r['fire_floor']:>10} {r['smoke_floor']:>11} {r['skip_rate']:>9.3f} {r['false_skips']:>11} "
+              f"{r['false_skip_rate']:>15.4f}")
+    if opt.report:
+        with open(opt.report, 'w') as f:
+            json.dump({'frames': len(frames), 'floors': report}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,37 +6,217 @@
     https://github.com/gengyanlei/fire-smoke-detect-yolov4
 """
 
+import asyncio
 import cv2
+import hashlib
 import torch
 import numpy as np
 import os
+import queue
 import sys
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(current_dir, "yolov5"))
-from models.experimental import attempt_load
-from utils.datasets import LoadImages, letterbox
-from utils.general import (check_img_size, non_max_suppression, scale_coords)
-from utils.torch_utils import select_device
+from utils.datasets import img_formats, letterbox
+from utils.general import (check_img_size, clip_coords, non_max_suppression, scale_coords)
+from utils.torch_utils import select_device, time_synchronized
+from video_toolpkg.inference_backends import (TORCHSCRIPT_DIR, OnnxModel, TorchScriptModel, export_torchscript,
+                                              load_quantized)
+from video_toolpkg.box_tracker import track_boxes
+from video_toolpkg.color_prefilter import color_fractions
+from video_toolpkg.inference_cache import InferenceCache, weights_digest
+from video_toolpkg.profiling import StageProfiler
+from video_toolpkg import model_registry
+
+CONF_THRES = 0.4  # NMS confidence threshold
+IOU_THRES = 0.5  # NMS IoU threshold
+DEFAULT_THRESHOLD = 60  # percentage boundary value of classes without one in class_thresholds
+
+# Weights used when none are given and the FIRE_SMOKE_WEIGHTS environment variable is not set,
+# relative to the working directory at the time the detector is created
+DEFAULT_WEIGHTS = './best.pt'
+
+# torch.inference_mode is available from torch 1.9, fall back to no_grad on older versions
+_inference_mode = getattr(torch, 'inference_mode', torch.no_grad)
+
+# Settings applied to the detector of each shard worker
+_SHARD_SETTINGS = ('imgsz', 'f_threshold', 's_threshold', 'class_thresholds', 'batch_size', 'sample_step',
+                   'sample_tolerance', 'gate_threshold', 'pipeline_workers', 'screen_weights', 'screen_imgsz',
+                   'escalate_threshold', 'fire_color_floor', 'smoke_color_floor', 'tile_size', 'tile_overlap',
+                   'roi_mask')
+
+# Counters of a path scan, see FireSmokeDetector.scan_stats
+_SCAN_STATS = ('frames', 'inferred', 'gated', 'color_skipped', 'screened', 'escalated', 'tracked')
 
 
 class FireSmokeDetector:
     """:class:`FireSmokeDetector` checks the existence of fire and smoke in source image
 
+    Args:
+        weights (str, optional): Path of the trained model. By default, the ``FIRE_SMOKE_WEIGHTS`` environment
+            variable, or ``DEFAULT_WEIGHTS`` in the working directory if it is not set
+            It is resolved to an absolute path when the detector is created
+            A ``.onnx`` graph exported by :func:`~video_toolpkg.inference_backends.export_onnx`
+            is run with ONNX Runtime on CPU, and a ``.int8.pt`` model made by
+            :func:`~video_toolpkg.quantization.quantize_model` is run in INT8 on CPU
+        device (str, optional): 'cpu' or a CUDA device such as '0'
+            By default, CUDA device 0 is used if available, otherwise CPU
+        threads (int, optional): Number of intra-op threads of torch, 0 (torch default) by default
+        interop_threads (int, optional): Number of inter-op threads of torch, 0 (torch default) by default
+        channels_last (bool, optional): Run the model in channels-last memory format, False by default
+            This is usually faster on CPU
+        bf16 (bool, optional): Run the model under bfloat16 autocast, False by default
+            Only supported on CPU, where it is faster on processors with native bfloat16 instructions
+        imgsz (int, optional): Image size the model is warmed up for, 640 by default
+        torchscript (bool, optional): Run a fused TorchScript export of ``.pt`` weights, False by default
+            The export is made on first use for each weights content, ``imgsz``, precision and device and kept in
+            ``TORCHSCRIPT_DIR``, so later detectors start without unpickling and fusing the YOLOv5 model
+
+    Notes:
+        Detectors created with the same weights, device, precision and ``imgsz`` share a single read-only model
+        through :mod:`~video_toolpkg.model_registry`. Call :meth:`release` when a detector is no longer needed
+
     Attributes:
         imgsz (int): Image size to be used for inference, 640 by default
             Must be set in multiples of 32, otherwise rounded up
         f_threshold (int): Percentage boundary value used to determine the presence of fire, 60 by default
         s_threshold (int): Percentage boundary value used to determine the presence of smoke, 60 by default
+        class_thresholds (dict): Percentage boundary values of the other classes of the model, empty by default
+            Classes that are not in it use ``DEFAULT_THRESHOLD``
+        f_exit_threshold (int): Percentage below which a fire event ends, None (``f_threshold``) by default
+        s_exit_threshold (int): Percentage below which a smoke event ends, None (``s_threshold``) by default
+        min_event_frames (int): Minimum number of frames of an event segment, 1 by default
+        batch_size (int): Number of frames inferred together when scanning a file, 1 by default
+        cache (InferenceCache or None): On-disk cache of path scan results, None (disabled) by default
+        sample_step (int): Infer every k-th frame first and densify around threshold crossings, 1 (dense) by default
+        sample_tolerance (int): Allowed error in frames of event boundaries found by sampling, 0 by default
+        gate_threshold (float): Mean gray level difference below which a frame reuses the previous result,
+            0 (disabled) by default
+        pipeline_workers (int): Number of preprocessing threads overlapping decode and letterbox with inference,
+            0 (serial) by default
+        profiler (StageProfiler): Recorder of per-stage latencies, None (disabled) by default
+        screen_weights (str): Path of a small screening model run before the full model, '' (disabled) by default
+        screen_imgsz (int): Image size of the screening model, 320 by default
+        escalate_threshold (int): Screening percentage from which a frame goes to the full model, 20 by default
+        fire_color_floor (float): Fraction of fire-colored pixels below which a frame may be skipped, 0.0 by default
+        smoke_color_floor (float): Fraction of smoke-colored pixels below which a frame may be skipped, 0.0 by default
+        tile_size (int): Side of the overlapping tiles frames are inferred in at full resolution,
+            0 (disabled) by default
+        tile_overlap (int): Overlap in pixels of neighbouring tiles, 64 by default
+        roi_mask (np.ndarray): Region of interest, only tiles intersecting it are inferred,
+            None (whole frame) by default
+        shard_workers (int): Number of processes scanning frame ranges of a single video, 0 (in process) by default
+        shard_threads (int): Number of torch threads in each shard worker, 0 (torch default) by default
+        scan_stats (dict): Number of frames, of actually inferred frames and of screened and escalated frames
+            in the last path scan
     """
-    def __init__(self) -> None:
+    def __init__(self, weights='', device='', threads=0, interop_threads=0, channels_last=False, bf16=False,
+                 imgsz=640, torchscript=False) -> None:
         """Initialize the :class:`FireSmokeDetector` object."""
-        self._device = select_device('0')
-        self._half = self._device.type != 'cpu'  # half precision only supported on CUDA        
-        self._model = attempt_load('./best.pt', map_location=self._device)  # load FP32 model
-        self.imgsz = 640
+        for value in (weights, device):
+            if type(value) is not str:
+                raise TypeError(f"'{value}' is not str but {type(value)}")
+        for value in (threads, interop_threads):
+            if type(value) is not int:
+                raise TypeError(f"'{value}' is not int but {type(value)}")
+            if value < 0:
+                raise ValueError(f"number of threads must not be negative")
+        if type(imgsz) is not int:
+            raise TypeError(f"'{imgsz}' is not int but {type(imgsz)}")
+        if imgsz <= 0:
+            raise ValueError(f"image size must be positive")
+        weights = os.path.abspath(weights or os.environ.get('FIRE_SMOKE_WEIGHTS') or DEFAULT_WEIGHTS)
+        onnx = os.path.splitext(weights)[-1].lower() == '.onnx'
+        quantized = weights.lower().endswith('.int8.pt')
+        if (onnx or quantized) and (device not in ('', 'cpu') or channels_last or bf16 or torchscript):
+            raise ValueError(f"ONNX and INT8 models only run on CPU without channels_last, bf16 or torchscript")
+        self._init_args = {'weights': weights, 'device': device, 'threads': threads,
+                           'interop_threads': interop_threads, 'channels_last': channels_last, 'bf16': bf16,
+                           'imgsz': imgsz, 'torchscript': torchscript}
+
+        if threads:
+            torch.set_num_threads(threads)
+        if interop_threads:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+            except RuntimeError:  # can only be set once, before any inter-op parallel work
+                print(f'WARNING: inter-op threads already set to {torch.get_num_interop_threads()}')
+
+        self._device = select_device('cpu' if onnx or quantized else device)  # falls back to CPU if CUDA is unavailable
+        self._half = self._device.type != 'cpu'  # half precision only supported on CUDA
+        if bf16 and self._half:
+            raise ValueError(f"bfloat16 autocast is only supported on CPU")
+        self._bf16 = bf16
+        self._channels_last = channels_last
+        self._weights = weights
+        self._weights_hash = None
+
+        precision = 'int8' if quantized else 'fp16' if self._half else 'fp32'
+
+        def load():
+            if onnx:
+                return OnnxModel(weights, threads=threads)
+            if quantized:
+                return load_quantized(weights)
+            if torchscript:
+                if self._weights_hash is None:
+                    self._weights_hash = weights_digest(weights)
+                device_name = str(self._device).replace(':', '')
+                path = os.path.join(TORCHSCRIPT_DIR, f'{self._weights_hash}-{imgsz}-{precision}-{device_name}.pt')
+                if not os.path.exists(path):
+                    export_torchscript(weights, path, device=str(self._device), half=self._half, imgsz=imgsz)
+                model = TorchScriptModel(path, self._device)
+            else:
+                from models.experimental import attempt_load  # only needed for eager models
+
+                model = attempt_load(weights, map_location=self._device)  # load FP32 model
+                if self._half:
+                    model.half()  # to FP16
+            if channels_last:
+                model.to(memory_format=torch.channels_last)
+            return model
+
+        precision += '-channels_last' * channels_last + '-torchscript' * torchscript
+        self._precision = precision + '-bf16' * bf16  # part of cache keys, as confidences depend on it
+        self._model_key = model_registry.model_key(weights, str(self._device), precision, imgsz)
+        self._model = model_registry.acquire(self._model_key, load)
+        try:
+            self.imgsz = imgsz
+        except Exception:
+            model_registry.release(self._model_key)  # the warm-up failed, do not keep the reference
+            raise
 
         self.f_threshold = 60
         self.s_threshold = 60
+        self.class_thresholds = {}
+        self.f_exit_threshold = None
+        self.s_exit_threshold = None
+        self.min_event_frames = 1
+        self.batch_size = 1
+        self.cache = None
+        self.sample_step = 1
+        self.sample_tolerance = 0
+        self.gate_threshold = 0
+        self.pipeline_workers = 0
+        self.profiler = None
+        self._screener = None
+        self.screen_weights = ''
+        self.screen_imgsz = 320
+        self.escalate_threshold = 20
+        self.fire_color_floor = 0.0
+        self.smoke_color_floor = 0.0
+        self._tile_grids = {}
+        self._tile_size = 0
+        self.tile_overlap = 64
+        self.tile_size = 0
+        self.roi_mask = None
+        self._shard_pool = None
+        self.shard_workers = 0
+        self.shard_threads = 0
+        self._scan_stats = dict.fromkeys(_SCAN_STATS, 0)
 
     @property
     def imgsz(self):
@@ -58,10 +238,9 @@ class FireSmokeDetector:
         if value <= 0:
             raise ValueError(f"image size must be positive")
         self._imgsz = check_img_size(value, s=self._model.stride.max())  # check img_size
-        if self._half:
-            self._model.half()  # to FP16
         img = torch.zeros((1, 3, self.imgsz, self.imgsz), device=self._device)  # init img
-        _ = self._model(img.half() if self._half else img) if self._device.type != 'cpu' else None  # run once
+        with _inference_mode():
+            _ = self._model(img.half() if self._half else img) if self._device.type != 'cpu' else None  # run once
 
     @property
     def f_threshold(self):
@@ -99,31 +278,635 @@ class FireSmokeDetector:
             raise ValueError(f"threshold must be a positive number within 100")
         self._s_threshold = value
 
-    def __determine_tf(self, dict, type) -> bool:
-        """Determine the true/false from a dict output through a single image
+    @property
+    def class_thresholds(self):
+        """dict: Percentage boundary values of the classes of the model other than fire and smoke, empty by default
+
+        Notes:
+            Keys are class names of the model. A class other than 'fire' and 'smoke' that is not in it
+            uses ``DEFAULT_THRESHOLD`` (60), fire and smoke always use ``f_threshold`` and ``s_threshold``
+
+        Raises:
+            TypeError: if the data type of the set ``class_thresholds`` or of any of its items is incorrect
+            ValueError: if a threshold is set for fire or smoke or not within a percentage range
+        """
+        return self._class_thresholds
+
+    @class_thresholds.setter
+    def class_thresholds(self, value):
+        if type(value) is not dict:
+            raise TypeError(f"'{value}' is not dict but {type(value)}")
+        for name, threshold in value.items():
+            if type(name) is not str:
+                raise TypeError(f"'{name}' is not str but {type(name)}")
+            if name in ('fire', 'smoke'):
+                raise ValueError(f"the threshold of {name} is set by f_threshold or s_threshold")
+            if type(threshold) is not int:
+                raise TypeError(f"'{threshold}' is not int but {type(threshold)}")
+            if threshold < 0 or threshold > 100:
+                raise ValueError(f"threshold must be a positive number within 100")
+        self._class_thresholds = dict(value)
+
+    @property
+    def f_exit_threshold(self):
+        """int: Percentage below which a fire event of :meth:`segments_from_percent` ends,
+        None (``f_threshold``) by default
+
+        Notes:
+            A value below ``f_threshold`` adds hysteresis, so that a flickering percentage does not split an event
+
+        Raises:
+            TypeError: if the data type of the set ``f_exit_threshold`` is incorrect
+            ValueError: if ``f_exit_threshold`` is set not within a percentage range
+        """
+        return self._f_exit_threshold
+
+    @f_exit_threshold.setter
+    def f_exit_threshold(self, value):
+        self._f_exit_threshold = self.__check_exit(value)
+
+    @property
+    def s_exit_threshold(self):
+        """int: Percentage below which a smoke event of :meth:`segments_from_percent` ends,
+        None (``s_threshold``) by default
+
+        Notes:
+            See ``f_exit_threshold``
+
+        Raises:
+            TypeError: if the data type of the set ``s_exit_threshold`` is incorrect
+            ValueError: if ``s_exit_threshold`` is set not within a percentage range
+        """
+        return self._s_exit_threshold
+
+    @s_exit_threshold.setter
+    def s_exit_threshold(self, value):
+        self._s_exit_threshold = self.__check_exit(value)
+
+    @staticmethod
+    def __check_exit(value):
+        """Private Method to validate an exit threshold"""
+        if value is None:
+            return None
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value < 0 or value > 100:
+            raise ValueError(f"threshold must be a positive number within 100")
+        return value
+
+    @property
+    def min_event_frames(self):
+        """int: Minimum number of frames of an event segment of :meth:`segments_from_percent`, 1 by default
+
+        Raises:
+            TypeError: if the data type of the set ``min_event_frames`` is incorrect
+            ValueError: if ``min_event_frames`` is set non-positive value
+        """
+        return self._min_event_frames
+
+    @min_event_frames.setter
+    def min_event_frames(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value <= 0:
+            raise ValueError(f"minimum event frames must be positive")
+        self._min_event_frames = value
+
+    @property
+    def batch_size(self):
+        """int: Number of frames inferred together when scanning a file, 1 by default
+
+        Notes:
+            Frames are stacked into a single ``(N, 3, H, W)`` tensor, so a larger value
+            trades memory for fewer model forwards and NMS calls
+
+        Raises:
+            TypeError: if the data type of the set ``batch_size`` is incorrect
+            ValueError: if ``batch_size`` is set non-positive value
+        """
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value <= 0:
+            raise ValueError(f"batch size must be positive")
+        self._batch_size = value
+
+    @property
+    def cache(self):
+        """InferenceCache or None: On-disk cache of path scan results, None (disabled) by default
+
+        Notes:
+            Results are keyed by the content of the source file, the model weights, ``imgsz``, the precision
+            and NMS settings, so changing thresholds reuses them without running the model again
+
+        Raises:
+            TypeError: if the data type of the set ``cache`` is incorrect
+        """
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        if value is not None and not isinstance(value, InferenceCache):
+            raise TypeError(f"'{value}' is not InferenceCache but {type(value)}")
+        self._cache = value
+
+    @property
+    def sample_step(self):
+        """int: Infer every k-th frame first and densify around threshold crossings, 1 (dense) by default
+
+        Notes:
+            Frames between two samples on the same side of ``f_threshold`` and ``s_threshold``
+            take the result of the preceding sample, so events shorter than ``sample_step`` frames may be missed.
+            Sampled scans depend on the thresholds and are never stored in ``cache``
+
+        Raises:
+            TypeError: if the data type of the set ``sample_step`` is incorrect
+            ValueError: if ``sample_step`` is set non-positive value
+        """
+        return self._sample_step
+
+    @sample_step.setter
+    def sample_step(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value <= 0:
+            raise ValueError(f"sample step must be positive")
+        self._sample_step = value
+
+    @property
+    def sample_tolerance(self):
+        """int: Allowed error in frames of event boundaries found by sampling, 0 by default
+
+        Notes:
+            Around a threshold crossing every ``sample_tolerance + 1``-th frame is inferred
+
+        Raises:
+            TypeError: if the data type of the set ``sample_tolerance`` is incorrect
+            ValueError: if ``sample_tolerance`` is set negative value
+        """
+        return self._sample_tolerance
+
+    @sample_tolerance.setter
+    def sample_tolerance(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value < 0:
+            raise ValueError(f"sample tolerance must not be negative")
+        self._sample_tolerance = value
+
+    @property
+    def gate_threshold(self):
+        """float: Mean gray level difference below which a frame reuses the previous result, 0 (disabled) by default
+
+        Notes:
+            Each frame is downsampled to 64x64 grayscale and compared with the last frame that was actually
+            inferred. The difference is the mean absolute difference in gray levels (0 - 255)
+
+        Raises:
+            TypeError: if the data type of the set ``gate_threshold`` is incorrect
+            ValueError: if ``gate_threshold`` is set negative value
+        """
+        return self._gate_threshold
+
+    @gate_threshold.setter
+    def gate_threshold(self, value):
+        if type(value) not in (int, float):
+            raise TypeError(f"'{value}' is not int or float but {type(value)}")
+        if value < 0:
+            raise ValueError(f"gate threshold must not be negative")
+        self._gate_threshold = value
+
+    @property
+    def pipeline_workers(self):
+        """int: Number of preprocessing threads overlapping decode and letterbox with inference, 0 (serial) by default
+
+        Notes:
+            Frames are decoded in a dedicated thread, letterboxed in a pool of ``pipeline_workers`` threads
+            and inferred in the calling thread. Stages are connected by a bounded queue that keeps frame order
+
+        Raises:
+            TypeError: if the data type of the set ``pipeline_workers`` is incorrect
+            ValueError: if ``pipeline_workers`` is set negative value
+        """
+        return self._pipeline_workers
+
+    @pipeline_workers.setter
+    def pipeline_workers(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value < 0:
+            raise ValueError(f"pipeline workers must not be negative")
+        self._pipeline_workers = value
+
+    @property
+    def profiler(self):
+        """StageProfiler: Recorder of per-stage latencies, None (disabled) by default
+
+        Notes:
+            Frames scanned by shard worker processes are not recorded
+
+        Raises:
+            TypeError: if the data type of the set ``profiler`` is incorrect
+        """
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, value):
+        if value is not None and not isinstance(value, StageProfiler):
+            raise TypeError(f"'{value}' is not StageProfiler but {type(value)}")
+        self._profiler = value
+
+    @property
+    def screen_weights(self):
+        """str: Path of a small screening model run on every frame before the full model, '' (disabled) by default
+
+        Notes:
+            The screening model, for example a reduced-width YOLOv5 trained with ``train.py``, runs at
+            ``screen_imgsz`` on every inferred frame. Only frames whose highest screening percentage reaches
+            ``escalate_threshold`` are inferred by the full model, the others get zero percentages.
+            It must have the same class names as the full model. Path scans are cascaded, reads are not
+
+        Raises:
+            TypeError: if the data type of the set ``screen_weights`` is incorrect
+        """
+        return self._screen_weights
+
+    @screen_weights.setter
+    def screen_weights(self, value):
+        if type(value) is not str:
+            raise TypeError(f"'{value}' is not str but {type(value)}")
+        self._screen_weights = value
+        self.__release_screener()
+
+    @property
+    def screen_imgsz(self):
+        """int: Image size of the screening model, 320 by default
+
+        Raises:
+            TypeError: if the data type of the set ``screen_imgsz`` is incorrect
+            ValueError: if ``screen_imgsz`` is set zero or negative value
+        """
+        return self._screen_imgsz
+
+    @screen_imgsz.setter
+    def screen_imgsz(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value <= 0:
+            raise ValueError(f"image size must be positive")
+        self._screen_imgsz = value
+        self.__release_screener()
+
+    @property
+    def escalate_threshold(self):
+        """int: Highest screening percentage from which a frame is inferred by the full model, 20 by default
+
+        Notes:
+            Screening percentages are not cut at ``CONF_THRES``, so any value trades recall for full model runs
+
+        Raises:
+            TypeError: if the data type of the set ``escalate_threshold`` is incorrect
+            ValueError: if ``escalate_threshold`` is set out of range 0 ~ 100
+        """
+        return self._escalate_threshold
+
+    @escalate_threshold.setter
+    def escalate_threshold(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if not 0 <= value <= 100:
+            raise ValueError(f"escalate threshold is out of range: {value}")
+        self._escalate_threshold = value
+
+    @property
+    def fire_color_floor(self):
+        """float: Fraction of fire-colored pixels below which a frame may be skipped, 0.0 (disabled) by default
+
+        Notes:
+            A frame of a path scan whose fractions of fire-colored and smoke-colored pixels, measured by
+            :func:`~video_toolpkg.color_prefilter.color_fractions`, are both below their floors is not inferred
+            and gets zero percentages, so both floors must be set. Measure the false-skip rate of the floors with
+            :func:`~video_toolpkg.color_prefilter.calibrate` before enabling them
+
+        Raises:
+            TypeError: if the data type of the set ``fire_color_floor`` is incorrect
+            ValueError: if ``fire_color_floor`` is set out of range 0.0 ~ 1.0
+        """
+        return self._fire_color_floor
+
+    @fire_color_floor.setter
+    def fire_color_floor(self, value):
+        self._fire_color_floor = self.__check_floor(value)
+
+    @property
+    def smoke_color_floor(self):
+        """float: Fraction of smoke-colored pixels below which a frame may be skipped, 0.0 (disabled) by default
+
+        Notes:
+            See ``fire_color_floor``
+
+        Raises:
+            TypeError: if the data type of the set ``smoke_color_floor`` is incorrect
+            ValueError: if ``smoke_color_floor`` is set out of range 0.0 ~ 1.0
+        """
+        return self._smoke_color_floor
+
+    @smoke_color_floor.setter
+    def smoke_color_floor(self, value):
+        self._smoke_color_floor = self.__check_floor(value)
+
+    @staticmethod
+    def __check_floor(value) -> float:
+        """Private Method to validate a color floor"""
+        if type(value) not in (int, float):
+            raise TypeError(f"'{value}' is not int or float but {type(value)}")
+        if not 0 <= value <= 1:
+            raise ValueError(f"color floor is out of range: {value}")
+        return float(value)
+
+    @property
+    def tile_size(self):
+        """int: Side of the tiles frames are inferred in at full resolution, 0 (disabled) by default
+
+        Notes:
+            Instead of being letterboxed to ``imgsz``, a frame is cut into ``tile_size`` tiles overlapping by
+            ``tile_overlap`` pixels, inferred in one forward pass. The percentages of a frame are the highest of its
+            tiles, and :meth:`boxes_from_read` merges the boxes of the tiles with NMS in frame coordinates.
+            Small flames in large frames are kept at the cost of one inference per tile
+
+        Raises:
+            TypeError: if the data type of the set ``tile_size`` is incorrect
+            ValueError: if ``tile_size`` is set negative value or, once rounded to the model stride,
+                not greater than ``tile_overlap``
+        """
+        return self._tile_size
+
+    @tile_size.setter
+    def tile_size(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value < 0:
+            raise ValueError(f"tile size must not be negative")
+        value = check_img_size(value, s=self._model.stride.max()) if value else 0
+        if value and value <= self.tile_overlap:
+            raise ValueError(f"tile size {value} must be greater than tile overlap {self.tile_overlap}")
+        self._tile_size = value
+        self._tile_grids = {}
+
+    @property
+    def tile_overlap(self):
+        """int: Overlap in pixels of neighbouring tiles, 64 by default
+
+        Notes:
+            Must be smaller than ``tile_size``, so lower it before lowering ``tile_size`` below it
+
+        Raises:
+            TypeError: if the data type of the set ``tile_overlap`` is incorrect
+            ValueError: if ``tile_overlap`` is set negative value or not smaller than ``tile_size``
+        """
+        return self._tile_overlap
+
+    @tile_overlap.setter
+    def tile_overlap(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value < 0:
+            raise ValueError(f"tile overlap must not be negative")
+        if self.tile_size and value >= self.tile_size:
+            raise ValueError(f"tile overlap {value} must be smaller than tile size {self.tile_size}")
+        self._tile_overlap = value
+        self._tile_grids = {}
+
+    @property
+    def roi_mask(self):
+        """np.ndarray: Region of interest of tiled inference, None (whole frame) by default
+
+        Notes:
+            A 2D array whose nonzero pixels mark the region of interest. It is resized to the size of each frame,
+            and only the tiles intersecting it are inferred, so compute scales with the area of interest.
+            A frame without any such tile gets zero percentages
+
+        Raises:
+            TypeError: if the data type of the set ``roi_mask`` is incorrect
+        """
+        return self._roi_mask
+
+    @roi_mask.setter
+    def roi_mask(self, value):
+        if value is not None and (type(value) != np.ndarray or value.ndim != 2):
+            raise TypeError(f"roi_mask is not a 2D numpy.ndarray")
+        self._roi_mask = None if value is None else (value != 0).astype(np.uint8)
+        self._tile_grids = {}
+
+    def __release_screener(self):
+        """Private Method to drop the screening detector so that it is loaded again with the current settings"""
+        if self._screener is not None:
+            self._screener.release()
+            self._screener = None
+
+    @property
+    def shard_workers(self):
+        """int: Number of processes scanning frame ranges of a single video, 0 (in process) by default
+
+        Notes:
+            A whole video is split into ``shard_workers`` contiguous frame ranges. Each worker process loads
+            the model once, seeks to the start of its range and scans it with the settings of this detector.
+            If the capture does not report the requested position after seeking, the worker grabs the frames
+            before its range instead. A capture that reports the requested position after an inexact seek
+            cannot be told apart, so compare a sharded scan with a dense one when using a new container format.
+            The pool is kept until the setting changes
+
+        Raises:
+            TypeError: if the data type of the set ``shard_workers`` is incorrect
+            ValueError: if ``shard_workers`` is set negative value
+        """
+        return self._shard_workers
+
+    @shard_workers.setter
+    def shard_workers(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value < 0:
+            raise ValueError(f"shard workers must not be negative")
+        self.__close_shard_pool()
+        self._shard_workers = value
+
+    @property
+    def shard_threads(self):
+        """int: Number of torch threads in each shard worker, 0 (torch default) by default
+
+        Raises:
+            TypeError: if the data type of the set ``shard_threads`` is incorrect
+            ValueError: if ``shard_threads`` is set negative value
+        """
+        return self._shard_threads
+
+    @shard_threads.setter
+    def shard_threads(self, value):
+        if type(value) is not int:
+            raise TypeError(f"'{value}' is not int but {type(value)}")
+        if value < 0:
+            raise ValueError(f"shard threads must not be negative")
+        self.__close_shard_pool()
+        self._shard_threads = value
+
+    def release(self):
+        """Release the shared model and the shard worker processes of this detector
+
+        Notes:
+            The detector can no longer be used afterwards
+        """
+        self.__close_shard_pool()
+        self.__release_screener()
+        if self._model is not None:
+            self._model = None
+            model_registry.release(self._model_key)
+
+    def __close_shard_pool(self):
+        """Private Method to shut down the worker processes of sharded scans"""
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown()
+            self._shard_pool = None
+
+    @property
+    def names(self) -> list:
+        """list[str]: Class names of the model, in the column order of percentages"""
+        return list(self._model.names)
+
+    @property
+    def scan_stats(self) -> dict:
+        """dict: Number of frames ('frames'), of actually inferred frames ('inferred')
+        and of frames that reused a previous result because of ``gate_threshold`` ('gated') in the last path scan.
+        With a screening model, also the frames it inferred ('screened'), those inferred by the full model as well
+        ('escalated') and their ratio ('escalation_rate'), the frames skipped by the color prefilter
+        ('color_skipped') and the frames whose boxes were tracked instead of detected ('tracked')
+        """
+        stats = dict(self._scan_stats)
+        stats['escalation_rate'] = stats['escalated'] / stats['screened'] if stats['screened'] else 0.0
+        return stats
+
+    def __determine_tf(self, percents, type):
+        """Determine the true/false from percentages output through one or more images
 
         Args:
-            dict: a dictionary that has 'fire' and 'smoke' as keys and the corresponding percentage as value
-            type (`'fire'` or `'smoke'`): a key in dict representing the vfx type to check
+            percents (np.ndarray): percentages in the column order of the model class names,
+                of shape (n_classes,) for a single image or (n_frames, n_classes) for a file
+            type (str): a class name of the model such as 'fire' or 'smoke'
 
         Returns:
-            bool: whether the ``dict[type]`` percentage is greater than or equal to the threshold
+            bool or np.ndarray: whether the ``type`` percentage is greater than or equal to the threshold,
+            a boolean array of shape (n_frames,) if ``percents`` holds multiple images
 
         Raises:
-            TypeError: if ``type`` is neither 'fire' nor 'smoke'
+            TypeError: if ``type`` is not a class name of the model
         """
-        print(dict)
+        return percents[..., self.__class_index(type)] >= self.__threshold(type)
+
+    def __threshold(self, type) -> int:
+        """Private Method to return the percentage boundary value of a class, see ``class_thresholds``"""
         if type == 'fire':
-            threshold = self.f_threshold
-        elif type == 'smoke':
-            threshold = self.s_threshold
-        else:
-            raise TypeError
+            return self.f_threshold
+        if type == 'smoke':
+            return self.s_threshold
+        return self.class_thresholds.get(type, DEFAULT_THRESHOLD)
+
+    def __class_index(self, type) -> int:
+        """Return the column of ``type`` in percentages output
+
+        Raises:
+            TypeError: if ``type`` is not a class name of the model
+        """
+        names = list(self._model.names)
+        if type not in names:
+            raise TypeError(f"'{type}' is not one of {names}")
+        return names.index(type)
+
+    def frames_from_percent(self, percents, type, thresholds=None):
+        """Select frames whose percentage of ``type`` reaches one or more thresholds
+
+        Args:
+            percents (np.ndarray): (n_frames, n_classes) percentages returned by :meth:`percent_from_path`
+            type (str): a class name of the model such as 'fire' or 'smoke'
+            thresholds (int or list[int], optional): percentage boundary values to evaluate
+                By default, the threshold of the class is used, see ``class_thresholds``
+
+        Returns:
+            np.ndarray or list[np.ndarray]: indices of the selected frames,
+            a list with one array per threshold if ``thresholds`` is a list
+
+        Raises:
+            TypeError: if ``type`` is not a class name of the model
+        """
+        if thresholds is None:
+            return np.flatnonzero(self.__determine_tf(percents, type))
+        column = percents[:, self.__class_index(type)]
+        if np.ndim(thresholds) == 0:
+            return np.flatnonzero(column >= thresholds)
+        masks = column[None, :] >= np.asarray(thresholds)[:, None]
+        return [np.flatnonzero(mask) for mask in masks]
+
+    def segments_from_percent(self, percents, type, enter=None, exit=None, min_frames=None, fps=0) -> list:
+        """Collapse the frames containing ``type`` into event segments with enter and exit hysteresis
+
+        Notes:
+            An event starts at a frame whose percentage reaches ``enter`` and lasts until the frame before
+            the first one below ``exit``. The segments are found in a single vectorized pass
+
+        Args:
+            percents (np.ndarray): (n_frames, n_classes) percentages returned by :meth:`percent_from_path`
+            type (str): a class name of the model such as 'fire' or 'smoke'
+            enter (int, optional): percentage starting an event. By default, the threshold of the class,
+                see ``class_thresholds``
+            exit (int, optional): percentage below which an event ends. By default, ``f_exit_threshold`` or
+                ``s_exit_threshold`` if set for fire or smoke, otherwise ``enter``
+            min_frames (int, optional): minimum number of frames of a segment, shorter ones are dropped,
+                ``min_event_frames`` by default
+            fps (float, optional): frame rate used for the timestamps. If 0 (default), timestamps are None
+
+        Returns:
+            list[dict]: 'start' and 'end' (inclusive) frames, 'start_time' and 'end_time' in seconds
+            and 'peak' percentage of each segment
+
+        Raises:
+            TypeError: if ``type`` is not a class name of the model
+            ValueError: if ``exit`` is greater than ``enter`` or ``min_frames`` is not positive
+        """
+        column = percents[:, self.__class_index(type)]
+        if enter is None:
+            enter = self.__threshold(type)
+        if exit is None:
+            exit = {'fire': self.f_exit_threshold, 'smoke': self.s_exit_threshold}.get(type)
+            exit = enter if exit is None else exit
+        if min_frames is None:
+            min_frames = self.min_event_frames
+        if exit > enter:
+            raise ValueError(f"exit threshold {exit} is greater than enter threshold {enter}")
+        if not isinstance(min_frames, int) or min_frames <= 0:  # ``type`` shadows the builtin here
+            raise ValueError(f"min_frames must be a positive int")
+
+        # Forward-fill the state of the last frame that crossed a threshold
+        entered = column >= enter
+        crossed = entered | (column < exit)
+        last = np.maximum.accumulate(np.where(crossed, np.arange(len(column)), -1))
+        active = np.where(last >= 0, entered[np.maximum(last, 0)], False)
+
+        edges = np.diff(np.concatenate([[0], active.astype(np.int8), [0]]))
+        starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        keep = stops - starts >= min_frames
+        starts, stops = starts[keep], stops[keep]
+        if not len(starts):
+            return []
+        bounds = np.stack([starts, stops], axis=1).ravel()
+        peaks = np.maximum.reduceat(np.concatenate([column, [0]]), bounds)[::2]
 
-        if dict[type] >= threshold:
-            return True
-        return False
+        return [{'start': int(a), 'end': int(b) - 1,
+                 'start_time': float(a / fps) if fps else None, 'end_time': float(b / fps) if fps else None,
+                 'peak': int(peak)} for a, b, peak in zip(starts, stops, peaks)]
 
+    @_inference_mode()
     def detect_fire_from_read(self, src_img) -> bool:
         """Determine existence of fire from a single image in the form of np.ndarray
 
@@ -137,30 +920,34 @@ class FireSmokeDetector:
             TypeError: if data type of ``src_img`` is incorrect
         
         """
-        per_dict = self.__percent_from_read(src_img)
-        return self.__determine_tf(per_dict, 'fire')
+        percents = self.percent_from_read(src_img)
+        return bool(self.__determine_tf(percents, 'fire'))
 
-    def detect_fire_from_path(self, src_path) -> list:
+    @_inference_mode()
+    def detect_fire_from_path(self, src_path, segments=False) -> list:
         """Determine existence of fire from multiple images in a file
 
         Args:
             src_path (str): path of an image file to determine the existence of fire
+            segments (bool, optional): return event segments instead of frames, False by default
+                See :meth:`segments_from_percent`, ``f_exit_threshold`` and ``min_event_frames``
 
         Returns:
             list[int]: a list of frames in video for a given path that are determined to contain fire
             Return an empty list if there is no such frame.
+            If ``segments`` is True, a list of event segments is returned instead
 
         Raises:
             TypeError: if data type of ``src_path`` is incorrect
+            ValueError: if ``segments`` is True and an exit threshold is greater than its threshold
             FileNotFoundError: if ``src_path`` is not exists or is a directory path
         """
-        per_list = self.__percent_from_path(src_path)
-        res_list = []
-        for i, per_dict in enumerate(per_list):
-            if self.__determine_tf(per_dict, 'fire'):
-                res_list.append(i)
-        return res_list
+        percents = self.percent_from_path(src_path)
+        if segments:
+            return self.segments_from_percent(percents, 'fire', fps=self.__frame_rate(src_path))
+        return np.flatnonzero(self.__determine_tf(percents, 'fire')).tolist()
 
+    @_inference_mode()
     def detect_smoke_from_read(self, src_img) -> bool:
         """Determine existence of smoke from a single image in the form of np.ndarray
 
@@ -173,39 +960,87 @@ class FireSmokeDetector:
         Raises:
             TypeError: if data type of ``src_img`` is incorrect
         """
-        per_dict = self.__percent_from_read(src_img)
-        return self.__determine_tf(per_dict, 'smoke')
+        percents = self.percent_from_read(src_img)
+        return bool(self.__determine_tf(percents, 'smoke'))
 
-    def detect_smoke_from_path(self, src_path) -> list:
+    @_inference_mode()
+    def detect_smoke_from_path(self, src_path, segments=False) -> list:
         """Determine existence of smoke from multiple images in a file
 
         Args:
             src_path (str): path of an image file to determine the existence of smoke
+            segments (bool, optional): return event segments instead of frames, False by default
+                See :meth:`segments_from_percent`, ``s_exit_threshold`` and ``min_event_frames``
 
         Returns:
             list[int]: a list of frames in video for a given path that are determined to contain smoke
             Return an empty list if there is no such frame.
+            If ``segments`` is True, a list of event segments is returned instead
 
         Raises:
             TypeError: if data type of ``src_path`` is incorrect
+            ValueError: if ``segments`` is True and an exit threshold is greater than its threshold
             FileNotFoundError: if ``src_path`` is not exists or is a directory path
         """
-        per_list = self.__percent_from_path(src_path)
-        res_list = []
-        for i, per_dict in enumerate(per_list):
-            if self.__determine_tf(per_dict, 'smoke'):
-                res_list.append(i)
-        return res_list
+        percents = self.percent_from_path(src_path)
+        if segments:
+            return self.segments_from_percent(percents, 'smoke', fps=self.__frame_rate(src_path))
+        return np.flatnonzero(self.__determine_tf(percents, 'smoke')).tolist()
 
-    def __percent_from_read(self, src_img) -> dict:
-        """Return a dictionary with percentages of fire and smoke extracted from a single image
-        in the form of np.ndarray
+    @_inference_mode()
+    def detect_all_from_read(self, src_img) -> dict:
+        """Determine existence of every class the model knows from a single image in the form of np.ndarray
 
         Args:
             src_img (np.ndarray): an image in the form of np.ndarray to determine the existence of fire and smoke
 
         Returns:
-            dict: a dictionary that has 'fire' and 'smoke' as keys and the corresponding percentage as value
+            dict: a dictionary that has the class names of the model as keys
+            and whether the image contains each of them as value
+
+        Raises:
+            TypeError: if data type of ``src_img`` is incorrect
+        """
+        percents = self.percent_from_read(src_img)
+        return {name: bool(self.__determine_tf(percents, name)) for name in self._model.names}
+
+    @_inference_mode()
+    def detect_all_from_path(self, src_path, segments=False) -> dict:
+        """Determine existence of every class the model knows from multiple images in a file
+
+        Notes:
+            The file is decoded and inferred only once for all classes
+
+        Args:
+            src_path (str): path of an image file to determine the existence of fire and smoke
+            segments (bool, optional): return event segments instead of frames, False by default
+                See :meth:`segments_from_percent`, the exit thresholds and ``min_event_frames``
+
+        Returns:
+            dict: a dictionary that has the class names of the model as keys
+            and a list of frames in video that are determined to contain each of them as value,
+            or a list of event segments if ``segments`` is True
+
+        Raises:
+            TypeError: if data type of ``src_path`` is incorrect
+            ValueError: if ``segments`` is True and an exit threshold is greater than its threshold
+            FileNotFoundError: if ``src_path`` is not exists or is a directory path
+        """
+        percents = self.percent_from_path(src_path)
+        if segments:
+            fps = self.__frame_rate(src_path)
+            return {name: self.segments_from_percent(percents, name, fps=fps) for name in self._model.names}
+        return {name: np.flatnonzero(self.__determine_tf(percents, name)).tolist() for name in self._model.names}
+
+    @_inference_mode()
+    def percent_from_read(self, src_img) -> np.ndarray:
+        """Return percentages of fire and smoke extracted from a single image in the form of np.ndarray
+
+        Args:
+            src_img (np.ndarray): an image in the form of np.ndarray to determine the existence of fire and smoke
+
+        Returns:
+            np.ndarray: uint8 percentages of shape (n_classes,) in the column order of the model class names
 
         Raises:
             TypeError: if data type of ``src_img`` is incorrect
@@ -213,81 +1048,843 @@ class FireSmokeDetector:
         if type(src_img) != np.ndarray or src_img.dtype != np.uint8:
             raise TypeError(f"src_img is not numpy.ndarray")
 
-        # Padded resize
-        img = letterbox(src_img, new_shape=self.imgsz)[0]
+        img = self.__preprocess(src_img)
+        return self.__run_inference(img[None] if self.tile_size else img)[0]
 
-        # Convert
-        img = img[:, :, ::-1].transpose(2, 0, 1)  # BGR to RGB, to 3x416x416
-        img = np.ascontiguousarray(img)
+    @_inference_mode()
+    def boxes_from_read(self, src_img) -> np.ndarray:
+        """Return the boxes of fire and smoke detected in a single image in the form of np.ndarray
 
-        res_dict = self.__run_inference(img)
-        return res_dict
+        Notes:
+            Unlike the percentage methods, this runs ``non_max_suppression``
+
+        Args:
+            src_img (np.ndarray): an image in the form of np.ndarray to detect fire and smoke in
+
+        Returns:
+            np.ndarray: float32 array of shape (n_boxes, 6) holding x1, y1, x2, y2 in pixels of ``src_img``,
+            the confidence and the class index in the model class names
+
+        Raises:
+            TypeError: if data type of ``src_img`` is incorrect
+        """
+        if type(src_img) != np.ndarray or src_img.dtype != np.uint8:
+            raise TypeError(f"src_img is not numpy.ndarray")
+
+        img = self.__preprocess(src_img)
+        if self.tile_size and not len(img):
+            return np.zeros((0, 6), dtype=np.float32)  # no tile in the region of interest
+        pred, t = self.__forward(img, 1)
+        if self.tile_size:  # move the boxes of each tile to frame coordinates and merge them
+            offsets = torch.tensor(self.__tile_grid(src_img.shape[:2]), device=pred.device, dtype=pred.dtype)
+            pred[..., :2] += offsets[:, None, :]
+            pred = pred.reshape(1, -1, pred.shape[-1])
+        det = non_max_suppression(pred, CONF_THRES, IOU_THRES)[0]
+        if self._profiler is not None:
+            self.__record('nms', t, 1)
+        if det is None or not len(det):
+            return np.zeros((0, 6), dtype=np.float32)
+        if self.tile_size:
+            clip_coords(det[:, :4], src_img.shape)  # boxes may reach into the padding of tiles past the border
+        else:
+            det[:, :4] = scale_coords(img.shape[1:], det[:, :4], src_img.shape).round()  # to src_img size
+        return det.cpu().numpy().astype(np.float32)
+
+    @_inference_mode()
+    def boxes_from_path(self, src_path, keyframe_interval=1, min_track_score=0.6, start=0, stop=None) -> list:
+        """Return the boxes of fire and smoke of every frame of a file, detecting them only on keyframes
+
+        Notes:
+            Boxes are detected with :meth:`boxes_from_read` every ``keyframe_interval`` frames and carried to the
+            frames in between by :func:`~video_toolpkg.box_tracker.track_boxes`. A frame where any box cannot be
+            tracked is detected instead and starts a new interval. Objects appearing between keyframes are found
+            at the next keyframe
+
+        Args:
+            src_path (str): path of an image file to detect fire and smoke in
+            keyframe_interval (int, optional): number of frames between detections, 1 (every frame) by default
+            min_track_score (float, optional): lowest template correlation of a tracked box, 0.6 by default
+            start (int, optional): index of the first frame to scan, 0 by default
+            stop (int, optional): index after the last frame to scan. By default, the file is scanned to the end
+
+        Returns:
+            list[np.ndarray]: (n_boxes, 6) boxes of each frame, see :meth:`boxes_from_read`
+
+        Raises:
+            TypeError: if data type of ``src_path``, ``keyframe_interval``, ``start`` or ``stop`` is incorrect
+            ValueError: if ``keyframe_interval`` is not positive or the frame range is empty or negative
+            FileNotFoundError: if ``src_path`` is not exists or is a directory path
+        """
+        self.__check_path(src_path, start, stop)
+        if type(keyframe_interval) is not int:
+            raise TypeError(f"'{keyframe_interval}' is not int but {type(keyframe_interval)}")
+        if keyframe_interval <= 0:
+            raise ValueError(f"keyframe interval must be positive")
+        self._scan_stats = dict.fromkeys(_SCAN_STATS, 0)
+
+        results = []
+        boxes, prev_gray, age = None, None, 0
+        for i, img0 in self.__read_frames(src_path, start=start, stop=stop):
+            gray = cv2.cvtColor(img0, cv2.COLOR_BGR2GRAY) if keyframe_interval > 1 else None
+            tracked = None
+            if boxes is not None and age < keyframe_interval:
+                tracked = track_boxes(prev_gray, gray, boxes, min_track_score)
+            if tracked is None:
+                boxes, age = self.boxes_from_read(img0), 1
+                self._scan_stats['inferred'] += 1
+            else:
+                boxes, age = tracked, age + 1
+                self._scan_stats['tracked'] += 1
+            results.append(boxes)
+            prev_gray = gray
+        self._scan_stats['frames'] = len(results)
+        return results
+
+    @_inference_mode()
+    def percent_from_reads(self, src_imgs) -> np.ndarray:
+        """Return percentages of fire and smoke extracted from several images, inferred together
+
+        Notes:
+            Images of the same letterboxed shape share a batch, regardless of ``batch_size``
+
+        Args:
+            src_imgs (list[np.ndarray]): images in the form of np.ndarray to determine the existence of fire and smoke
+
+        Returns:
+            np.ndarray: uint8 percentages of shape (n_images, n_classes) in the column order of the model class names
+
+        Raises:
+            TypeError: if data type of ``src_imgs`` is incorrect
+        """
+        if type(src_imgs) is not list:
+            raise TypeError(f"'{src_imgs}' is not list but {type(src_imgs)}")
+        for src_img in src_imgs:
+            if type(src_img) != np.ndarray or src_img.dtype != np.uint8:
+                raise TypeError(f"src_img is not numpy.ndarray")
+
+        imgs = [self.__preprocess(src_img) for src_img in src_imgs]
+        percents = np.zeros((len(imgs), len(self._model.names)), dtype=np.uint8)
+        for shape in set(img.shape for img in imgs):
+            group = [i for i, img in enumerate(imgs) if img.shape == shape]
+            percents[group] = self.__run_inference(np.stack([imgs[i] for i in group]))
+        return percents
 
-    def __percent_from_path(self, src_path) -> list:
-        """Return a list of dictionary with percentages of fire and smoke extracted from multiple images in a file
+    @_inference_mode()
+    def percent_from_path(self, src_path, start=0, stop=None) -> np.ndarray:
+        """Return percentages of fire and smoke extracted from multiple images in a file
+
+        Notes:
+            Frames can be selected with a vectorized comparison on the result,
+            see :meth:`frames_from_percent` to evaluate several thresholds at once
 
         Args:
             src_path (str): path of an image file to determine the existence of fire and smoke
+            start (int, optional): index of the first frame to scan, 0 by default
+            stop (int, optional): index after the last frame to scan. By default, the file is scanned to the end
 
         Returns:
-            list[dict]: a list of dictionary
-            that has 'fire' and 'smoke' as keys and the corresponding percentage as value
+            np.ndarray: uint8 percentages of shape (n_frames, n_classes) in the column order of the model class names
 
         Raises:
-            TypeError: if data type of ``src_path`` is incorrect
+            TypeError: if data type of ``src_path``, ``start`` or ``stop`` is incorrect
+            ValueError: if ``start`` is negative or ``stop`` is not greater than ``start``
+            FileNotFoundError: if ``src_path`` is not exists or is a directory path
+        """
+        self.__check_path(src_path, start, stop)
+        self._scan_stats = dict.fromkeys(_SCAN_STATS, 0)
+
+        whole = start == 0 and stop is None
+        cacheable = self.cache is not None and self.sample_step == 1 and whole
+        if cacheable:
+            if self._weights_hash is None:
+                self._weights_hash = weights_digest(self._weights)
+            filters = {}
+            if self.screen_weights:
+                filters = {'screen_hash': weights_digest(self.screen_weights), 'screen_imgsz': self.screen_imgsz,
+                           'escalate_threshold': self.escalate_threshold, 'screen_conf_floor': 0}
+            if self.fire_color_floor and self.smoke_color_floor:
+                filters.update(fire_color_floor=self.fire_color_floor, smoke_color_floor=self.smoke_color_floor)
+            if self.tile_size:
+                roi = ''
+                if self.roi_mask is not None:  # masks of the same bytes but another shape select other tiles
+                    roi = f'{self.roi_mask.shape}:{hashlib.sha1(self.roi_mask).hexdigest()}'
+                filters.update(tile_size=self.tile_size, tile_overlap=self.tile_overlap, roi=roi)
+            key = self.cache.make_key(src_path, self._weights_hash, imgsz=self.imgsz, precision=self._precision,
+                                      conf_thres=CONF_THRES, iou_thres=IOU_THRES, gate_threshold=self.gate_threshold,
+                                      reduce='max', **filters)
+            hit = self.cache.get(key)
+            if hit is not None:
+                self._scan_stats['frames'] = len(hit[1])
+                return hit[1]
+
+        if self.shard_workers and whole and frame_count(src_path) > 1:
+            percents = self.__shard_path(src_path)
+        elif self.sample_step == 1:
+            percents = self.__scan_path(src_path, start, stop)
+        else:
+            percents = self.__sample_path(src_path, start, stop)
+
+        if cacheable:
+            self.cache.put(key, src_path, self._model.names, percents)
+        return percents
+
+    async def astream(self, src_path, start=0, stop=None, max_in_flight=64, executor=None):
+        """Asynchronously yield the percentages of each frame of a file as soon as it is inferred
+
+        Notes:
+            Decoding and inference run in ``executor`` and, if ``pipeline_workers`` is set, decoding runs in a thread
+            of its own, so the event loop is never blocked. At most ``max_in_flight`` results wait for the consumer,
+            after which the scan pauses. Cancelling the consumer or closing the generator stops the scan.
+            Caching, sampling and sharding do not apply
+
+        Examples:
+            >>> async for frame_idx, confs in detector.astream('video.mp4'):
+            ...     print(frame_idx, confs)
+
+        Args:
+            src_path (str): path of an image file to determine the existence of fire and smoke
+            start (int, optional): index of the first frame to scan, 0 by default
+            stop (int, optional): index after the last frame to scan. By default, the file is scanned to the end
+            max_in_flight (int, optional): maximum number of results waiting for the consumer, 64 by default
+            executor (concurrent.futures.Executor, optional): executor running the scan,
+                the default executor of the event loop by default
+
+        Yields:
+            tuple[int, np.ndarray]: index and uint8 percentages of shape (n_classes,) of each frame, in frame order
+
+        Raises:
+            TypeError: if data type of ``src_path``, ``start``, ``stop`` or ``max_in_flight`` is incorrect
+            ValueError: if ``start`` is negative, ``stop`` is not greater than ``start``
+                or ``max_in_flight`` is not positive
             FileNotFoundError: if ``src_path`` is not exists or is a directory path
         """
+        self.__check_path(src_path, start, stop)
+        if type(max_in_flight) is not int:
+            raise TypeError(f"'{max_in_flight}' is not int but {type(max_in_flight)}")
+        if max_in_flight <= 0:
+            raise ValueError(f"max_in_flight must be positive")
+
+        loop = asyncio.get_running_loop()
+        results = asyncio.Queue()
+        slots = threading.Semaphore(max_in_flight)  # bounds the results not taken by the consumer yet
+        stop_scan = threading.Event()
+        done = object()
+
+        def scan():
+            try:
+                with _inference_mode():
+                    for indices, percents, _ in self.__infer_batches(self.__read_frames(src_path, start=start,
+                                                                                        stop=stop)):
+                        for item in zip(indices.tolist(), percents):
+                            while not slots.acquire(timeout=0.1):
+                                if stop_scan.is_set():
+                                    return
+                            if stop_scan.is_set():
+                                return
+                            loop.call_soon_threadsafe(results.put_nowait, item)
+            except Exception as e:
+                loop.call_soon_threadsafe(results.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(results.put_nowait, done)
+
+        future = loop.run_in_executor(executor, scan)
+        try:
+            while True:
+                item = await results.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                slots.release()
+                yield item
+        finally:
+            stop_scan.set()
+            await asyncio.wait([future])  # the capture is released before returning
+
+    @_inference_mode()
+    def percent_from_paths(self, src_paths) -> list:
+        """Return percentages of fire and smoke extracted from each of several files
+
+        Notes:
+            Frames of consecutive files are batched together, which keeps batches full for short clips.
+            Consecutive frames of the same letterboxed shape share a batch
+
+        Args:
+            src_paths (list[str]): paths of image files to determine the existence of fire and smoke
+
+        Returns:
+            list[np.ndarray]: uint8 percentages of shape (n_frames, n_classes) for each file
+
+        Raises:
+            TypeError: if data type of ``src_paths`` is incorrect
+            FileNotFoundError: if a path is not exists or is a directory path
+        """
+        if type(src_paths) is not list:
+            raise TypeError(f"'{src_paths}' is not list but {type(src_paths)}")
+        for src_path in src_paths:
+            if type(src_path) is not str:
+                raise TypeError(f"'{src_path}' is not str but {type(src_path)}")
+            if not os.path.isfile(src_path):
+                raise FileNotFoundError(f'{os.path.abspath(src_path)} is not a file')
+        if not src_paths:
+            return []
+        self._scan_stats = dict.fromkeys(_SCAN_STATS, 0)
+
+        counts, firsts = [], set()
+
+        def frames():
+            offset = 0
+            for src_path in src_paths:
+                end = [0]
+                firsts.add(offset)
+                for i, img0 in self.__read_frames(src_path, n_frames=end):
+                    yield offset + i, img0
+                counts.append(end[0])
+                offset += end[0]
+
+        indices, percents, inferred = self.__infer_frames(frames(), firsts)
+        self._scan_stats.update(frames=len(indices), inferred=inferred,
+                                gated=len(indices) - inferred - self._scan_stats['color_skipped'])
+        return np.split(percents, np.cumsum(counts)[:-1])
+
+    @staticmethod
+    def __check_path(src_path, start, stop):
+        """Private Method to validate the file and frame range of a scan"""
         if type(src_path) is not str:
             raise TypeError(f"'{src_path}' is not str but {type(src_path)}")
         if not os.path.exists(src_path):
             raise FileNotFoundError(f"{os.path.abspath(src_path)} does not exist")
         if not os.path.isfile(src_path):
             raise FileNotFoundError(f'{os.path.abspath(src_path)} is not a file')
+        if type(start) is not int:
+            raise TypeError(f"'{start}' is not int but {type(start)}")
+        if stop is not None and type(stop) is not int:
+            raise TypeError(f"'{stop}' is not int but {type(stop)}")
+        if start < 0 or (stop is not None and stop <= start):
+            raise ValueError(f"frame range {start} ~ {stop} is empty or negative")
+
+    def __scan_path(self, src_path, start=0, stop=None) -> np.ndarray:
+        """Run the model over every frame of a file
+
+        Args:
+            src_path (str): path of an image file to run inference on
+            start (int, optional): index of the first frame to scan
+            stop (int, optional): index after the last frame to scan
 
-        # Set Dataloader
-        dataset = LoadImages(src_path, img_size=self.imgsz)
+        Returns:
+            np.ndarray: uint8 percentages of shape (n_frames, n_classes)
+        """
+        frames = self.__read_frames(src_path, start=start, stop=stop)
+        indices, percents, inferred = self.__infer_frames(frames)
+        self._scan_stats.update(frames=len(indices), inferred=inferred,
+                                gated=len(indices) - inferred - self._scan_stats['color_skipped'])
+        return percents
+
+    def __sample_path(self, src_path, start=0, stop=None) -> np.ndarray:
+        """Run the model over every ``sample_step``-th frame of a file, then densify between samples
+        on different sides of the thresholds
+
+        Args:
+            src_path (str): path of an image file to run inference on
+            start (int, optional): index of the first frame to scan
+            stop (int, optional): index after the last frame to scan
+
+        Returns:
+            np.ndarray: uint8 percentages of shape (n_frames, n_classes),
+            frames not inferred take the result of the preceding inferred frame
+        """
+        # Coarse pass, the last frame is sampled as well so that the tail is bounded
+        end = [start]
+        count = frame_count(src_path)
+        last = (count if stop is None else min(count, stop)) - 1
+
+        def select(i):
+            return (i - start) % self.sample_step == 0 or i == last
+
+        indices, percents, inferred = self.__infer_frames(self.__read_frames(src_path, select, end, start, stop))
+
+        # Fine pass over the intervals whose ends disagree for any class
+        states = np.stack([self.__determine_tf(percents, name) for name in self._model.names], axis=-1)
+        changed = np.flatnonzero((states[1:] != states[:-1]).any(axis=-1))
+        fine = set()
+        for a, b in zip(indices[changed], indices[changed + 1]):
+            fine.update(range(a + 1, b, self.sample_tolerance + 1))
+        if fine:
+            frames = self.__read_frames(src_path, fine.__contains__, start=min(fine), stop=max(fine) + 1)
+            fine_indices, fine_percents, fine_inferred = self.__infer_frames(frames)
+            inferred += fine_inferred
+            order = np.argsort(np.concatenate([indices, fine_indices]), kind='stable')
+            indices = np.concatenate([indices, fine_indices])[order]
+            percents = np.concatenate([percents, fine_percents])[order]
+
+        n_frames = end[0] - start
+        self._scan_stats.update(frames=n_frames, inferred=inferred,
+                                gated=len(indices) - inferred - self._scan_stats['color_skipped'])
+
+        # Hold the result of the preceding inferred frame
+        ref = np.searchsorted(indices, np.arange(start, end[0]), side='right') - 1
+        return percents[np.maximum(ref, 0)]
+
+    def __shard_path(self, src_path) -> np.ndarray:
+        """Scan contiguous frame ranges of a video in the ``shard_workers`` processes and merge the results
+
+        Args:
+            src_path (str): path of a video file to run inference on
+
+        Returns:
+            np.ndarray: uint8 percentages of shape (n_frames, n_classes)
+        """
+        if self._shard_pool is None:
+            self._shard_pool = ProcessPoolExecutor(self.shard_workers, mp_context=multiprocessing.get_context('spawn'),
+                                                   initializer=_init_shard_worker,
+                                                   initargs=(self.shard_threads, self._init_args))
+        config = {name: getattr(self, name) for name in _SHARD_SETTINGS}
+        count = frame_count(src_path)
+        bounds = np.linspace(0, count, min(self.shard_workers, count) + 1).astype(int).tolist()
+        stops = bounds[1:-1] + [None]  # the last shard reads to the end in case the reported count is short
+        shards = [self._shard_pool.submit(_scan_shard, config, os.path.abspath(src_path), start, stop)
+                  for start, stop in zip(bounds[:-1], stops)]
 
-        # Run inference
         res_list = []
-        for _, img, _, _ in dataset:
-            sub_res = self.__run_inference(img)
-            res_list.append(sub_res)
-        return res_list
+        self._scan_stats = dict.fromkeys(_SCAN_STATS, 0)
+        for shard in shards:
+            percents, stats = shard.result()
+            res_list.append(percents)
+            for name in _SCAN_STATS:
+                self._scan_stats[name] += stats[name]
+        return np.concatenate(res_list)
 
-    def __run_inference(self, img) -> dict:
-        """Use the trained model to infer the percentage probability that fire and smoke exist in a given image
+    def __read_frames(self, src_path, select=None, n_frames=None, start=0, stop=None):
+        """Decode frames of an image or video file
 
         Args:
-            img (np.ndarray): an image in the form of np.ndarray to proceed with inference
+            src_path (str): path of an image file
+            select (callable, optional): predicate on the frame index, frames for which it is false
+                are only grabbed without being retrieved. By default, every frame is retrieved
+            n_frames (list, optional): a single-item list set to the number of frames read once exhausted
+            start (int, optional): index of the first frame to read, sought to if the capture then reports
+                that position, otherwise reached by grabbing the frames before it
+            stop (int, optional): index after the last frame to read. By default, the file is read to the end
+
+        Yields:
+            tuple[int, np.ndarray]: index and BGR image of each selected frame
+        """
+        if os.path.splitext(src_path)[-1].lower() in img_formats:
+            t = time.time()
+            img0 = cv2.imread(src_path)  # BGR
+            if img0 is None:
+                raise ValueError(f'{os.path.abspath(src_path)} is not a readable image')
+            if n_frames is not None:
+                n_frames[0] = 1
+            if self._profiler is not None:
+                self._profiler.record('decode', time.time() - t)
+            yield 0, img0
+            return
+
+        cap = cv2.VideoCapture(src_path)
+        if not cap.isOpened():
+            raise ValueError(f'{os.path.abspath(src_path)} is not a readable video')
+        if start and not (cap.set(cv2.CAP_PROP_POS_FRAMES, start) and cap.get(cv2.CAP_PROP_POS_FRAMES) == start):
+            # Seeking is not frame-accurate in every container, so grab the frames before start instead
+            cap.release()
+            cap = cv2.VideoCapture(src_path)
+            for _ in range(start):
+                if not cap.grab():
+                    break
+        i = start
+        t = time.time()
+        try:
+            while stop is None or i < stop:
+                if not cap.grab():
+                    break
+                if select is None or select(i):
+                    ret, img0 = cap.retrieve()
+                    if not ret:
+                        break
+                    if self._profiler is not None:
+                        self._profiler.record('decode', time.time() - t)  # with the frames grabbed since
+                    yield i, img0
+                    t = time.time()
+                i += 1
+        finally:
+            cap.release()
+        if n_frames is not None:
+            n_frames[0] = i
+
+    @staticmethod
+    def __frame_rate(src_path) -> float:
+        """Return the frame rate reported by the container of a file, 0 for an image file"""
+        if os.path.splitext(src_path)[-1].lower() in img_formats:
+            return 0
+        cap = cv2.VideoCapture(src_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        return fps
+
+    def __preprocess(self, img0) -> np.ndarray:
+        """Letterbox a BGR image and convert it to a contiguous 3xHxW RGB array,
+        or to a kx3xTxT array of its tiles if ``tile_size`` is set"""
+        t = time.time() if self._profiler is not None else None
+
+        if self.tile_size:
+            size = self.tile_size
+            tiles = []
+            for x0, y0 in self.__tile_grid(img0.shape[:2]):
+                tile = img0[y0:y0 + size, x0:x0 + size]
+                if tile.shape[:2] != (size, size):  # pad the tiles of frames smaller than a tile
+                    tile = cv2.copyMakeBorder(tile, 0, size - tile.shape[0], 0, size - tile.shape[1],
+                                              cv2.BORDER_CONSTANT, value=(114, 114, 114))
+                tiles.append(tile)
+            img = np.stack(tiles) if tiles else np.zeros((0, size, size, 3), dtype=np.uint8)
+            img = np.ascontiguousarray(img[..., ::-1].transpose(0, 3, 1, 2))  # BGR to RGB, to kx3xTxT
+            if t is not None:
+                self._profiler.record('letterbox', time.time() - t)
+            return img
+
+        # Padded resize
+        img = letterbox(img0, new_shape=self.imgsz)[0]
+
+        # Convert
+        img = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1))  # BGR to RGB, to 3x416x416
+        if t is not None:
+            self._profiler.record('letterbox', time.time() - t)
+        return img
+
+    def __tile_grid(self, shape) -> list:
+        """Private Method to return the top-left corners of the tiles of a frame shape that intersect ``roi_mask``"""
+        if shape not in self._tile_grids:
+            self._tile_grids[shape] = tile_grid(shape, self.tile_size, self.tile_overlap, self.roi_mask)
+        return self._tile_grids[shape]
+
+    def __infer_frames(self, frames, firsts=()):
+        """Run inference on batches of ``batch_size`` letterboxed frames
+
+        Notes:
+            If ``gate_threshold`` is set, frames that barely differ from the last inferred frame
+            reuse its result instead of being inferred. If color floors are set, frames with too few
+            fire-colored and smoke-colored pixels get zero percentages instead of being inferred
+
+        Args:
+            frames (iterable): (index, BGR image) pairs
+            firsts (set[int], optional): indices of frames that are always inferred, such as the first frame of a file
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, int]: indices of the frames, their uint8 percentages of shape
+            (n, n_classes) and the number of frames that were actually inferred
+        """
+        chunks = list(self.__infer_batches(frames, firsts))
+        if not chunks:
+            return np.zeros(0, dtype=int), np.zeros((0, len(self._model.names)), dtype=np.uint8), 0
+        indices, percents, inferred = zip(*chunks)
+        return np.concatenate(indices), np.concatenate(percents), sum(inferred)
+
+    def __infer_batches(self, frames, firsts=()):
+        """Run inference on batches of ``batch_size`` letterboxed frames, yielding results batch by batch
+
+        Args:
+            frames (iterable): (index, BGR image) pairs
+            firsts (set[int], optional): indices of frames that are always inferred, such as the first frame of a file
+
+        Yields:
+            tuple[np.ndarray, np.ndarray, int]: indices of the frames up to an inferred batch, their uint8
+            percentages of shape (n, n_classes) and the number of frames that were actually inferred
+        """
+        if self.pipeline_workers:
+            items = self.__pipeline(frames)
+        else:
+            items = ((i, img0, None, None, None) for i, img0 in frames)
+
+        # refs index the result of the last frame that was not gated (0), the results of the pending batch
+        # and zero percentages (-1) for frames skipped by the color prefilter
+        indices, refs, batch = [], [], []
+        zeros = np.zeros((1, len(self._model.names)), dtype=np.uint8)
+        last, last_ref = zeros, 0
+        last_thumb = None
+        prefilter = self.fire_color_floor > 0 and self.smoke_color_floor > 0
+        for i, img0, img, thumb, colors in items:
+            if self.gate_threshold:
+                if thumb is None:
+                    thumb = self.__gate_thumb(img0)
+                if (last_thumb is not None and i not in firsts
+                        and cv2.absdiff(thumb, last_thumb).mean() < self.gate_threshold):
+                    indices.append(i)
+                    refs.append(last_ref)
+                    continue
+                last_thumb = thumb
+
+            if prefilter:
+                fire, smoke = colors if colors is not None else color_fractions(img0)
+                if fire < self.fire_color_floor and smoke < self.smoke_color_floor:
+                    self._scan_stats['color_skipped'] += 1
+                    indices.append(i)
+                    refs.append(-1)
+                    last_ref = -1
+                    continue
+
+            if img is None:
+                img = self.__preprocess(img0)
+            if batch and (len(batch) == self.batch_size or img.shape != batch[0].shape):
+                res = np.concatenate([last, self.__infer_batch(np.stack(batch)), zeros])
+                yield np.array(indices), res[refs], len(batch)
+                last, last_ref = res[last_ref][None], 0
+                indices, refs, batch = [], [], []
+            batch.append(img)
+            indices.append(i)
+            refs.append(len(batch))
+            last_ref = len(batch)
+        if indices:
+            res = np.concatenate([last, self.__infer_batch(np.stack(batch)) if batch else zeros[:0], zeros])
+            yield np.array(indices), res[refs], len(batch)
+
+    def __infer_batch(self, imgs) -> np.ndarray:
+        """Private Method to infer a batch of letterboxed images, through the screening model first if one is set"""
+        if imgs.ndim == 5:
+            return self.__merge_tiles(imgs, self.__infer_batch)
+        if not self.screen_weights:
+            return self.__run_inference(imgs)
+        if self._screener is None:
+            screener = FireSmokeDetector(self.screen_weights, self._init_args['device'], imgsz=self.screen_imgsz)
+            if screener.names != self.names:
+                screener.release()
+                raise ValueError(f"screening model classes {screener.names} differ from {self.names}")
+            self._screener = screener
+
+        # Shrink the letterboxed batch to the size of the screening model
+        h, w = imgs.shape[-2:]
+        r = self._screener.imgsz / max(h, w)
+        stride = int(self._screener._model.stride.max())
+        size = (max(round(w * r / stride), 1) * stride, max(round(h * r / stride), 1) * stride)
+        small = np.stack([cv2.resize(img.transpose(1, 2, 0), size, interpolation=cv2.INTER_AREA) for img in imgs])
+        screened = self._screener.__run_inference(np.ascontiguousarray(small.transpose(0, 3, 1, 2)), conf_floor=0)
+
+        # Frames the full model does not see are negative, whatever their screening percentages
+        escalate = np.flatnonzero(screened.max(axis=1) >= self.escalate_threshold)
+        percents = np.zeros_like(screened)
+        if len(escalate):
+            percents[escalate] = self.__run_inference(imgs[escalate])
+        self._scan_stats['screened'] += len(imgs)
+        self._scan_stats['escalated'] += len(escalate)
+        return percents
+
+    def __pipeline(self, frames):
+        """Decode frames in a thread and preprocess them in a pool of ``pipeline_workers`` threads
+
+        Args:
+            frames (iterable): (index, BGR image) pairs
+
+        Yields:
+            tuple: index, None, letterboxed 3xHxW image, gate thumbnail (None if gating is disabled)
+            and color fractions (None if the color prefilter is disabled) of each frame, in the order of ``frames``
+        """
+        done = object()
+        stop = threading.Event()
+        futures = queue.Queue(maxsize=2 * max(self.batch_size, self.pipeline_workers))
+
+        prefilter = self.fire_color_floor > 0 and self.smoke_color_floor > 0
+
+        def prepare(img0):
+            thumb = self.__gate_thumb(img0) if self.gate_threshold else None
+            colors = color_fractions(img0) if prefilter else None
+            return self.__preprocess(img0), thumb, colors
+
+        def decode(pool):
+            try:
+                for i, img0 in frames:
+                    if stop.is_set():
+                        break
+                    futures.put((i, pool.submit(prepare, img0)))  # blocks while the queue is full
+            except Exception as e:
+                futures.put((None, e))
+            finally:
+                futures.put((None, done))
+
+        with ThreadPoolExecutor(self.pipeline_workers) as pool:
+            decoder = threading.Thread(target=decode, args=(pool,), daemon=True)
+            decoder.start()
+            try:
+                while True:
+                    i, future = futures.get()
+                    if future is done:
+                        break
+                    if i is None:
+                        raise future
+                    yield (i, None, *future.result())
+            finally:
+                stop.set()
+                while decoder.is_alive():  # unblock the decoder if it waits on a full queue
+                    try:
+                        futures.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+
+    @staticmethod
+    def __gate_thumb(img0) -> np.ndarray:
+        """Return the 64x64 grayscale thumbnail of a BGR image compared by ``gate_threshold``"""
+        thumb = cv2.resize(img0, (64, 64), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY)
+
+    def __run_inference(self, img, conf_floor=CONF_THRES) -> np.ndarray:
+        """Use the trained model to infer the percentage probability that fire and smoke exist in given images
+
+        Notes:
+            The percentage of a class is the highest ``obj_conf * cls_conf`` of any box above ``conf_floor``,
+            reduced on the prediction tensor for the whole batch. With ``CONF_THRES``, this is the highest
+            confidence ``non_max_suppression`` would keep for the class, as NMS never suppresses the best box
+
+        Args:
+            img (np.ndarray): a single image (3xHxW) or a batch of images (Nx3xHxW) to proceed with inference
+            conf_floor (float, optional): confidence at or below which objects and boxes are ignored,
+                ``CONF_THRES`` by default. The screening model uses 0 so that low percentages are kept
+
+        Returns:
+            np.ndarray: uint8 percentages of shape (N, n_classes) in the column order of the model class names
+        """
+        if img.ndim == 5:
+            return self.__merge_tiles(img, lambda tiles: self.__run_inference(tiles, conf_floor))
+        profiler = self._profiler
+        n = len(img) if img.ndim == 4 else 1
+        pred, t = self.__forward(img, n)
+
+        # Per-class maximum of candidates, like the multi-label candidates of non_max_suppression
+        x = pred[..., 4:].float()
+        obj = x[..., :1]
+        conf = (x[..., 1:] * (obj * (obj > conf_floor))).max(1)[0]  # conf = obj_conf * cls_conf
+        conf = conf * (conf > conf_floor)
+        percents = (conf * 100).to(torch.uint8).cpu().numpy()
+        if profiler is not None:
+            self.__record('nms', t, n)
+
+        return percents
+
+    def __merge_tiles(self, imgs, infer) -> np.ndarray:
+        """Private Method to infer the NxKx3xTxT tiles of N frames with ``infer`` and keep the highest percentages
+        of the tiles of each frame"""
+        n, k = imgs.shape[:2]
+        if not k:
+            return np.zeros((n, len(self._model.names)), dtype=np.uint8)  # no tile in the region of interest
+        return infer(imgs.reshape(n * k, *imgs.shape[2:])).reshape(n, k, -1).max(1)
+
+    def __forward(self, img, n):
+        """Private Method to copy images to the device and run the model
 
         Returns:
-            dict: a dictionary that has 'fire' and 'smoke' as keys and the corresponding percentage as value
+            tuple[torch.Tensor, float]: the prediction of shape (N, n_boxes, 5 + n_classes)
+            and the time it was ready if ``profiler`` is set
         """
+        profiler = self._profiler
+        t = time_synchronized() if profiler is not None else None
         img = torch.from_numpy(img).to(self._device)
         img = img.half() if self._half else img.float()  # uint8 to fp16/32
         img /= 255.0  # 0 - 255 to 0.0 - 1.0
         if img.ndimension() == 3:
             img = img.unsqueeze(0)
+        if self._channels_last:
+            img = img.contiguous(memory_format=torch.channels_last)
+        if profiler is not None:
+            t = self.__record('h2d', t, n)
 
         # Inference
-        pred = self._model(img, augment=False)[0]
+        if self._bf16:
+            with torch.autocast('cpu', dtype=torch.bfloat16):
+                pred = self._model(img, augment=False)[0].float()
+        else:
+            pred = self._model(img, augment=False)[0]
+        if profiler is not None:
+            t = self.__record('forward', t, n)
+        return pred, t
+
+    def __record(self, stage, t, n) -> float:
+        """Private Method to record a stage that started at ``t`` and return the time it ended"""
+        now = time_synchronized()
+        self._profiler.record(stage, now - t, n)
+        return now
+
 
-        # Apply NMS
-        pred = non_max_suppression(pred, 0.4, 0.5)
+def frame_count(src_path) -> int:
+    """Return the number of frames reported by the container of a file, 1 for an image file"""
+    if os.path.splitext(src_path)[-1].lower() in img_formats:
+        return 1
+    cap = cv2.VideoCapture(src_path)
+    count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return count
 
-        res_dict = {
-            'fire': 0,
-            'smoke': 0
-        }
 
-        # Process detections            
-        for _, det in enumerate(pred):  # detections per image
-            if det is not None and len(det):
-                # Write results
-                for *_, conf, cls in det:
-                    res_dict[self._model.names[int(cls)]] = int(conf * 100)
+def tile_grid(shape, size, overlap, mask=None) -> list:
+    """Return the top-left corners of the overlapping tiles covering a frame
+
+    Notes:
+        Tiles start every ``size - overlap`` pixels and the last tile of a row or column ends at the border.
+        A frame smaller than a tile along an axis has a single tile at 0 on that axis
+
+    Args:
+        shape (tuple[int, int]): height and width of the frame
+        size (int): side of the square tiles
+        overlap (int): overlap in pixels of neighbouring tiles, smaller than ``size``
+        mask (np.ndarray, optional): 2D region of interest resized to the frame, only tiles intersecting
+            its nonzero pixels are kept. By default, every tile is kept
+
+    Returns:
+        list[tuple[int, int]]: x and y of the top-left corner of each tile, row by row
+
+    Raises:
+        ValueError: if ``size`` is not positive or ``overlap`` is negative or not smaller than ``size``
+    """
+    if size <= 0 or not 0 <= overlap < size:
+        raise ValueError(f"tile overlap {overlap} must be between 0 and tile size {size}")
+    height, width = shape
+    step = size - overlap
+    xs = list(range(0, max(width - size, 0) + 1, step))
+    ys = list(range(0, max(height - size, 0) + 1, step))
+    if xs[-1] + size < width:
+        xs.append(width - size)  # the last tile ends at the border
+    if ys[-1] + size < height:
+        ys.append(height - size)
+    grid = [(x0, y0) for y0 in ys for x0 in xs]
+    if mask is not None:
+        mask = cv2.resize(mask, (width, height), interpolation=cv2.INTER_NEAREST)
+        grid = [(x0, y0) for x0, y0 in grid if mask[y0:y0 + size, x0:x0 + size].any()]
+    return grid
+
+
+_shard_detector = None
+
+
+def _init_shard_worker(threads, init_args=None):
+    """Load the model once in a shard worker process"""
+    global _shard_detector
+    init_args = dict(init_args or {})
+    if threads:
+        init_args['threads'] = threads
+    _shard_detector = FireSmokeDetector(**init_args)
+
+
+def _worker_detector(config):
+    """Return the detector of a worker process with the settings of the parent detector applied"""
+    changes = {}
+    for name, value in config.items():
+        current = getattr(_shard_detector, name)
+        if isinstance(value, np.ndarray) or isinstance(current, np.ndarray):
+            changed = not np.array_equal(current, value)
+        else:
+            changed = current != value
+        if changed:
+            changes[name] = value
+    if 'tile_size' in changes or 'tile_overlap' in changes:
+        # Disable tiling first and set the size last, as each of the two is checked against the other
+        changes['tile_size'] = changes.pop('tile_size', _shard_detector.tile_size)
+        _shard_detector.tile_size = 0
+    for name, value in changes.items():
+        setattr(_shard_detector, name, value)
+    return _shard_detector
+
 
-        return res_dict
+def _scan_shard(config, src_path, start, stop):
+    """Scan a frame range in a shard worker process with the settings of the parent detector"""
+    detector = _worker_detector(config)
+    with torch.no_grad():
+        percents = detector.percent_from_path(src_path, start, stop)
+    return percents, detector.scan_stats
 
 
 def main():
@@ -295,9 +1892,8 @@ def main():
         source = sys.argv[1]
         fd = FireSmokeDetector()
         with torch.no_grad():
-            fire_frames = fd.detect_fire_from_path(source)
-            smoke_frames = fd.detect_smoke_from_path(source)
-            print(f'fire: {fire_frames}\n smoke: {smoke_frames}')
+            res_dict = fd.detect_all_from_path(source)
+            print(f'fire: {res_dict["fire"]}\n smoke: {res_dict["smoke"]}')
     else:
         print('source 경로를 입력하세요.')
 
@@ -0,0 +1,233 @@
+"""InferenceBackends
+    A module for running the fire/smoke model with runtimes other than eager PyTorch,
+    behind the same interface as the YOLOv5 model used by :class:`FireSmokeDetector`
+"""
+
+import json
+import os
+import sys
+import zipfile
+
+import numpy as np
+import torch
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if os.path.join(current_dir, "yolov5") not in sys.path:
+    sys.path.append(os.path.join(current_dir, "yolov5"))
+
+TORCHSCRIPT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'video_toolpkg', 'torchscript')
+
+
+def export_onnx(weights: str, des_path='', opset=12) -> str:
+    """Export a trained YOLOv5 ``*.pt`` model to an ONNX graph loadable by :class:`OnnxModel`
+
+    Notes:
+        The graph ends before the box decoding of the ``Detect`` layer and has dynamic batch, height and width,
+        so it accepts the same letterboxed batches as the PyTorch model. Class names, strides and anchors are
+        stored in the metadata of the graph and the decoding is done by :class:`OnnxModel`
+
+    Args:
+        weights (str): path of the ``*.pt`` weights to export
+        des_path (str, optional): save path of the ONNX graph
+            By default, the extension of ``weights`` is replaced with ``.onnx``
+        opset (int, optional): ONNX opset version, 12 by default
+
+    Returns:
+        str: save path of the ONNX graph
+    """
+    import onnx
+    from models.experimental import attempt_load
+
+    if not des_path:
+        des_path = os.path.splitext(weights)[0] + '.onnx'
+    model = attempt_load(weights, map_location=torch.device('cpu'))  # fused FP32 model
+    detect = model.model[-1]
+    detect.export = True  # return the raw output of each detection layer
+    img = torch.zeros((1, 3, 640, 640))
+    outputs = [f'output{i}' for i in range(detect.nl)]
+    dynamic_axes = {name: {0: 'batch', 2: 'height', 3: 'width'} for name in outputs}
+    dynamic_axes['images'] = {0: 'batch', 2: 'height', 3: 'width'}
+    torch.onnx.export(model, img, des_path, opset_version=opset, input_names=['images'], output_names=outputs,
+                      dynamic_axes=dynamic_axes)
+
+    onnx_model = onnx.load(des_path)
+    meta = {'names': list(model.names), 'stride': detect.stride.tolist(), 'anchor_grid': detect.anchor_grid.tolist()}
+    for key, value in meta.items():
+        prop = onnx_model.metadata_props.add()
+        prop.key, prop.value = key, json.dumps(value)
+    onnx.checker.check_model(onnx_model)
+    onnx.save(onnx_model, des_path)
+    return des_path
+
+
+def export_torchscript(weights: str, des_path='', device='cpu', half=False, imgsz=640) -> str:
+    """Export a trained YOLOv5 ``*.pt`` model to a fused TorchScript module loadable by :class:`TorchScriptModel`
+
+    Notes:
+        Like :func:`export_onnx`, the module ends before the box decoding of the ``Detect`` layer so that it accepts
+        any input shape. The module is traced on ``device`` in the given precision, so it is only valid there
+
+    Args:
+        weights (str): path of the ``*.pt`` weights to export
+        des_path (str, optional): save path of the TorchScript module
+            By default, the extension of ``weights`` is replaced with ``.torchscript.pt``
+        device (str, optional): device to trace the module on, 'cpu' by default
+        half (bool, optional): trace the module in FP16, False by default
+        imgsz (int, optional): image size to trace the module with, 640 by default
+
+    Returns:
+        str: save path of the TorchScript module
+    """
+    from models.experimental import attempt_load
+    from utils.general import check_img_size
+
+    if not des_path:
+        des_path = os.path.splitext(weights)[0] + '.torchscript.pt'
+    device = torch.device(device)
+    model = attempt_load(weights, map_location=device)  # fused FP32 model
+    if half:
+        model.half()
+    detect = model.model[-1]
+    detect.export = True  # return the raw output of each detection layer
+    imgsz = check_img_size(imgsz, s=model.stride.max())
+    img = torch.zeros((1, 3, imgsz, imgsz), device=device, dtype=torch.float16 if half else torch.float32)
+    check = torch.zeros((2, 3, imgsz, imgsz + 32), device=device, dtype=img.dtype)  # another batch and shape
+    traced = torch.jit.trace(model, img, check_inputs=[(check,)])
+
+    meta = {'names': list(model.names), 'stride': detect.stride.tolist(), 'anchor_grid': detect.anchor_grid.tolist()}
+    os.makedirs(os.path.dirname(os.path.abspath(des_path)), exist_ok=True)
+    tmp_path = f'{des_path}.{os.getpid()}.tmp'  # concurrent exports must not see a partial file
+    torch.jit.save(traced, tmp_path, _extra_files={'meta.json': json.dumps(meta)})
+    os.replace(tmp_path, des_path)
+    return des_path
+
+
+def load_quantized(path: str):
+    """Load an INT8 model saved by :func:`~video_toolpkg.quantization.quantize_model` on CPU
+
+    Args:
+        path (str): path of the quantized model
+
+    Returns:
+        TorchScriptModel: the traced quantized model
+    """
+    with zipfile.ZipFile(path) as archive:  # the engine must be set before the packed weights are loaded
+        names = [name for name in archive.namelist() if name.endswith('/extra/meta.json')]
+        if not names:
+            raise ValueError(f'{os.path.abspath(path)} was not saved by quantize_model')
+        meta = json.loads(archive.read(names[0]))
+    torch.backends.quantized.engine = meta['engine']  # the engine the model was quantized for
+    return TorchScriptModel(path)
+
+
+class OnnxModel:
+    """:class:`OnnxModel` runs a graph exported by :func:`export_onnx` with the CPU execution provider
+    of ONNX Runtime
+
+    Args:
+        path (str): path of the ONNX graph
+        threads (int, optional): Number of intra-op threads of ONNX Runtime, 0 (runtime default) by default
+
+    Attributes:
+        names (list[str]): Class names of the model
+        stride (torch.Tensor): Strides of the detection layers
+    """
+    def __init__(self, path: str, threads=0):
+        """Initialize the :class:`OnnxModel` object."""
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self._session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        meta = self._session.get_modelmeta().custom_metadata_map
+        if not {'names', 'stride', 'anchor_grid'} <= set(meta):
+            raise ValueError(f'{os.path.abspath(path)} was not exported by export_onnx')
+        self.names = json.loads(meta['names'])
+        self.stride = torch.tensor(json.loads(meta['stride']))
+        self._anchor_grid = torch.tensor(json.loads(meta['anchor_grid']))  # shape(nl,1,na,1,1,2)
+        self._input = self._session.get_inputs()[0].name
+
+    def __call__(self, img, augment=False):
+        """Run the graph and decode boxes the same way as the ``Detect`` layer of YOLOv5
+
+        Args:
+            img (torch.Tensor): a batch of images of shape (N, 3, H, W) scaled to 0.0 - 1.0
+            augment (bool, optional): not supported, must be False
+
+        Returns:
+            tuple[torch.Tensor, None]: predictions of shape (N, n_boxes, 5 + n_classes)
+        """
+        if augment:
+            raise ValueError(f"augmented inference is not supported by ONNX Runtime models")
+        outputs = self._session.run(None, {self._input: img.cpu().numpy().astype(np.float32)})
+        return _decode([torch.from_numpy(x) for x in outputs], self.stride, self._anchor_grid), None
+
+
+class TorchScriptModel:
+    """:class:`TorchScriptModel` runs a module exported by :func:`export_torchscript` without importing
+    the model classes of YOLOv5
+
+    Args:
+        path (str): path of the TorchScript module
+        device (torch.device, optional): device the module was exported for, CPU by default
+
+    Attributes:
+        names (list[str]): Class names of the model
+        stride (torch.Tensor): Strides of the detection layers
+    """
+    def __init__(self, path: str, device=torch.device('cpu')):
+        """Initialize the :class:`TorchScriptModel` object."""
+        extra_files = {'meta.json': ''}
+        self._module = torch.jit.load(path, map_location=device, _extra_files=extra_files)
+        if not extra_files['meta.json']:
+            raise ValueError(f'{os.path.abspath(path)} was not exported by export_torchscript')
+        meta = json.loads(extra_files['meta.json'])
+        self.names = meta['names']
+        self.stride = torch.tensor(meta['stride'])
+        self._anchor_grid = torch.tensor(meta['anchor_grid'], device=device)  # shape(nl,1,na,1,1,2)
+
+    def __call__(self, img, augment=False):
+        """Run the module and decode boxes the same way as the ``Detect`` layer of YOLOv5
+
+        Args:
+            img (torch.Tensor): a batch of images of shape (N, 3, H, W) scaled to 0.0 - 1.0
+            augment (bool, optional): not supported, must be False
+
+        Returns:
+            tuple[torch.Tensor, None]: predictions of shape (N, n_boxes, 5 + n_classes)
+        """
+        if augment:
+            raise ValueError(f"augmented inference is not supported by TorchScript models")
+        return _decode(self._module(img), self.stride, self._anchor_grid), None
+
+    def parameters(self):
+        return self._module.parameters()
+
+    def to(self, *args, **kwargs):
+        self._module.to(*args, **kwargs)
+        return self
+
+
+def _decode(outputs, stride, anchor_grid):
+    """Decode the raw outputs of the detection layers the same way as the ``Detect`` layer of YOLOv5"""
+    z = []
+    for i, x in enumerate(outputs):
+        bs, na, ny, nx, no = x.shape  # x(bs,3,20,20,85)
+        yv, xv = torch.meshgrid([torch.arange(ny, device=x.device), torch.arange(nx, device=x.device)])
+        grid = torch.stack((xv, yv), 2).view((1, 1, ny, nx, 2)).float()
+        y = x.float().sigmoid()
+        y[..., 0:2] = (y[..., 0:2] * 2. - 0.5 + grid) * float(stride[i])  # xy
+        y[..., 2:4] = (y[..., 2:4] * 2) ** 2 * anchor_grid[i]  # wh
+        z.append(y.view(bs, -1, no))
+    return torch.cat(z, 1)
+
+
+def main():
+    if len(sys.argv) == 2:
+        print(f'ONNX export success, saved as {export_onnx(sys.argv[1])}')
+    else:
+        print('weights 경로를 입력하세요.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""InferenceCache
+    A module for storing per-frame fire and smoke percentages of scanned files on disk,
+    so that the same footage can be re-evaluated with other thresholds without running the model again
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+
+
+def file_fingerprint(path: str, samples=8, sample_size=65536) -> str:
+    """Return a cheap fingerprint of a file made of its size, mtime and a hash of sampled chunks
+
+    Args:
+        path (str): path of the file to fingerprint
+        samples (int, optional): number of chunks read at evenly spaced offsets, 8 by default
+        sample_size (int, optional): size in bytes of each chunk, 64KiB by default
+
+    Returns:
+        str: hex digest identifying the content of the file
+    """
+    stat = os.stat(path)
+    sha = hashlib.sha1(f'{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    with open(path, 'rb') as f:
+        step = max(stat.st_size - sample_size, 0) // max(samples - 1, 1)
+        for i in range(samples):
+            f.seek(i * step)
+            sha.update(f.read(sample_size))
+    return sha.hexdigest()
+
+
+def weights_digest(path: str) -> str:
+    """Return the hash of the full content of a weights file
+
+    Args:
+        path (str): path of the weights file
+
+    Returns:
+        str: hex digest of the file content
+    """
+    sha = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class InferenceCache:
+    """:class:`InferenceCache` keeps per-frame class percentages in a size-bounded SQLite database
+
+    Entries are evicted in least recently used order once the total size exceeds ``max_bytes``.
+
+    Args:
+        db_path (str, optional): path of the SQLite database file
+            By default, ``~/.cache/video_toolpkg/inference_cache.sqlite`` is used
+        max_bytes (int, optional): upper bound of the total size of stored results, 1GiB by default
+
+    Attributes:
+        _default_db_path (str): Default path of the SQLite database file
+    """
+    _default_db_path = os.path.join(os.path.expanduser('~'), '.cache', 'video_toolpkg', 'inference_cache.sqlite')
+
+    def __init__(self, db_path='', max_bytes=1 << 30):
+        """Initialize the :class:`InferenceCache` object."""
+        if type(max_bytes) is not int:
+            raise TypeError(f"'{max_bytes}' is not int but {type(max_bytes)}")
+        if max_bytes <= 0:
+            raise ValueError(f"max_bytes must be positive")
+        self._db_path = db_path if db_path else self._default_db_path
+        self._max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self._db_path)), exist_ok=True)
+        with closing(self.__connect()) as conn, conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS entries ('
+                         'key TEXT PRIMARY KEY, src_path TEXT, names TEXT, nbytes INTEGER, '
+                         'created REAL, last_access REAL, data BLOB)')
+
+    @property
+    def db_path(self) -> str:
+        """str: Path of the SQLite database file"""
+        return self._db_path
+
+    @property
+    def max_bytes(self) -> int:
+        """int: Upper bound of the total size of stored results"""
+        return self._max_bytes
+
+    @staticmethod
+    def make_key(src_path: str, weights_hash: str, **settings) -> str:
+        """Build the key of a scan from the content of the source file, the model weights and inference settings
+
+        Args:
+            src_path (str): path of the scanned file
+            weights_hash (str): digest of the weights used for inference, see :func:`weights_digest`
+            **settings: any other value affecting the result such as ``imgsz`` or NMS thresholds
+
+        Returns:
+            str: key to be used with :meth:`get` and :meth:`put`
+        """
+        parts = [file_fingerprint(src_path), weights_hash]
+        parts += [f'{k}={settings[k]}' for k in sorted(settings)]
+        return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+    def get(self, key: str):
+        """Return the stored result for ``key`` and mark it as recently used
+
+        Args:
+            key (str): key built with :meth:`make_key`
+
+        Returns:
+            tuple[list[str], np.ndarray] or None: class names and ``(n_frames, n_classes)`` percentages,
+            None if there is no such entry
+        """
+        with closing(self.__connect()) as conn, conn:
+            row = conn.execute('SELECT names, data FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0]), np.load(io.BytesIO(row[1]))
+
+    def put(self, key: str, src_path: str, names, percents: np.ndarray):
+        """Store a result and evict least recently used entries if the cache got too large
+
+        Args:
+            key (str): key built with :meth:`make_key`
+            src_path (str): path of the scanned file, kept for inspection only
+            names (list[str]): class names corresponding to the columns of ``percents``
+            percents (np.ndarray): ``(n_frames, n_classes)`` percentages
+        """
+        buf = io.BytesIO()
+        np.save(buf, percents)
+        data = buf.getvalue()
+        now = time.time()
+        with closing(self.__connect()) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (key, os.path.abspath(src_path), json.dumps(list(names)), len(data), now, now, data))
+        self.prune()
+
+    def entries(self) -> list:
+        """Return information about the stored entries, most recently used first
+
+        Returns:
+            list[dict]: a dictionary per entry with 'key', 'src_path', 'nbytes', 'created' and 'last_access'
+        """
+        with closing(self.__connect()) as conn:
+            rows = conn.execute('SELECT key, src_path, nbytes, created, last_access FROM entries '
+                                'ORDER BY last_access DESC').fetchall()
+        return [dict(zip(('key', 'src_path', 'nbytes', 'created', 'last_access'), row)) for row in rows]
+
+    def prune(self, max_bytes=None) -> int:
+        """Evict least recently used entries until the total size is within ``max_bytes``
+
+        Args:
+            max_bytes (int, optional): size bound to apply, ``max_bytes`` of the cache by default
+
+        Returns:
+            int: number of evicted entries
+        """
+        if max_bytes is None:
+            max_bytes = self._max_bytes
+        with closing(self.__connect()) as conn, conn:
+            rows = conn.execute('SELECT key, nbytes FROM entries ORDER BY last_access DESC').fetchall()
+            sizes = np.cumsum([nbytes for _, nbytes in rows])
+            evicted = [(key,) for (key, _), total in zip(rows, sizes) if total > max_bytes]
+            conn.executemany('DELETE FROM entries WHERE key = ?', evicted)
+        return len(evicted)
+
+    def clear(self):
+        """Remove every entry of the cache"""
+        with closing(self.__connect()) as conn:
+            conn.isolation_level = None  # VACUUM cannot run inside a transaction
+            conn.execute('DELETE FROM entries')
+            conn.execute('VACUUM')
+
+    def __connect(self):
+        """Private Method to open a connection to the database"""
+        return sqlite3.connect(self._db_path, timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect and prune the fire/smoke inference cache')
+    parser.add_argument('--db', type=str, default='', help='path of the cache database')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='list cached scans, most recently used first')
+    prune_parser = sub.add_parser('prune', help='evict least recently used scans')
+    prune_parser.add_argument('--max-bytes', type=int, required=True, help='size to shrink the cache to')
+    sub.add_parser('clear', help='remove every cached scan')
+    opt = parser.parse_args()
+
+    cache = InferenceCache(opt.db)
+    if opt.command == 'list':
+        entries = cache.entries()
+        for entry in entries:
+            last_access = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_access']))
+            print(f"{entry['key'][:12]}  {entry['nbytes']:>10}  {last_access}  {entry['src_path']}")
+        print(f"{len(entries)} entries, {sum(e['nbytes'] for e in entries)} bytes in {cache.db_path}")
+    elif opt.command == 'prune':
+        print(f'{cache.prune(opt.max_bytes)} entries evicted')
+    elif opt.command == 'clear':
+        cache.clear()
+        print('cache cleared')
+
+
+if __name__ == '__main__':
+    main()
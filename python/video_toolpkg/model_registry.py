@@ -0,0 +1,76 @@
+"""ModelRegistry
+    A module for sharing loaded fire/smoke models between the :class:`FireSmokeDetector` objects of a process,
+    so that each combination of weights, device, precision and image size is loaded only once
+"""
+
+import os
+import threading
+
+_lock = threading.Lock()
+_entries = {}  # key -> [model, reference count]
+
+
+def model_key(weights: str, device: str, precision: str, imgsz: int) -> tuple:
+    """Return the registry key of a model
+
+    Args:
+        weights (str): path of the weights file, resolved to an absolute real path
+        device (str): device the model runs on, such as 'cpu' or 'cuda:0'
+        precision (str): numeric format of the model, such as 'fp32', 'fp16' or 'fp32-channels_last'
+        imgsz (int): image size the model was warmed up for
+
+    Returns:
+        tuple: the key to use with :func:`acquire` and :func:`release`
+    """
+    return os.path.realpath(weights), device, precision, imgsz
+
+
+def acquire(key: tuple, loader):
+    """Return the shared model of ``key``, loading it with ``loader`` if it is not loaded yet
+
+    Notes:
+        The returned model is shared and must be treated as read-only.
+        Every call must be paired with a call to :func:`release`
+
+    Args:
+        key (tuple): key made by :func:`model_key`
+        loader (callable): function without arguments returning the loaded model
+
+    Returns:
+        the shared model
+    """
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            model = loader()
+            for p in getattr(model, 'parameters', lambda: [])():
+                p.requires_grad_(False)
+            entry = _entries[key] = [model, 0]
+        entry[1] += 1
+        return entry[0]
+
+
+def release(key: tuple):
+    """Drop a reference to the shared model of ``key``, unloading it once no reference is left
+
+    Args:
+        key (tuple): key made by :func:`model_key`
+
+    Raises:
+        KeyError: if the model of ``key`` is not loaded
+    """
+    with _lock:
+        entry = _entries[key]
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _entries[key]
+
+
+def loaded() -> dict:
+    """Return the models currently loaded
+
+    Returns:
+        dict: reference count of each loaded model by key
+    """
+    with _lock:
+        return {key: entry[1] for key, entry in _entries.items()}
@@ -0,0 +1,153 @@
+"""Profiling
+    A module for recording the time spent in each stage of :class:`FireSmokeDetector` scans
+    into fixed-memory latency histograms
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+STAGES = ('decode', 'letterbox', 'h2d', 'forward', 'nms')
+
+
+class LatencyHistogram:
+    """:class:`LatencyHistogram` counts durations in logarithmic bins, so its memory does not grow with the samples
+
+    Args:
+        low (float, optional): upper bound in seconds of the first bin, 1 microsecond by default
+        high (float, optional): lower bound in seconds of the last bin, 100 seconds by default
+        n_bins (int, optional): number of bins between ``low`` and ``high``, 256 by default (about 7% wide each)
+
+    """
+    def __init__(self, low=1e-6, high=100.0, n_bins=256):
+        """Initialize the :class:`LatencyHistogram` object."""
+        self._low = low
+        self._log_ratio = math.log(high / low) / n_bins
+        self._counts = np.zeros(n_bins + 2, dtype=np.int64)  # with an underflow and an overflow bin
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        """Count a duration
+
+        Args:
+            seconds (float): the duration in seconds
+        """
+        index = int(math.log(seconds / self._low) / self._log_ratio) + 1 if seconds > self._low else 0
+        self._counts[min(index, len(self._counts) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q: float) -> float:
+        """Return an estimate of a percentile of the durations
+
+        Args:
+            q (float): the percentile, between 0 and 100
+
+        Returns:
+            float: the geometric center in seconds of the bin holding the percentile, 0.0 if nothing was counted
+        """
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self._counts), math.ceil(self.count * q / 100)))
+        return self._low * math.exp((index - 0.5) * self._log_ratio) if index else self._low
+
+
+class StageProfiler:
+    """:class:`StageProfiler` records per-stage latencies of a :class:`FireSmokeDetector`
+
+    Set it as the ``profiler`` of a detector to record the stages of :data:`STAGES`:
+    frame decoding, ``letterbox``, the host-to-device copy, the model forward pass and the post-processing
+    ('nms'), which is the per-class maximum of the percentage methods or ``non_max_suppression`` for boxes.
+    GPU stages are timed with ``time_synchronized``, which waits for CUDA work to finish.
+
+    Args:
+        report_path (str, optional): file the summary is written to when the process exits, nothing by default
+            A path ending with ``.json`` is written as JSON, any other path as a Prometheus textfile
+
+    """
+    def __init__(self, report_path=''):
+        """Initialize the :class:`StageProfiler` object."""
+        if type(report_path) is not str:
+            raise TypeError(f"'{report_path}' is not str but {type(report_path)}")
+        self._lock = threading.Lock()
+        self.reset()
+        if report_path:
+            atexit.register(self.write, report_path)
+
+    def reset(self):
+        """Discard everything recorded so far"""
+        with self._lock:
+            self._histograms = {stage: LatencyHistogram() for stage in STAGES}
+            self._items = dict.fromkeys(STAGES, 0)
+            self._first = self._last = None
+
+    def record(self, stage: str, seconds: float, items=1):
+        """Record the duration of a stage
+
+        Args:
+            stage (str): one of :data:`STAGES`
+            seconds (float): duration of the stage in seconds
+            items (int, optional): number of frames processed by the stage, 1 by default
+        """
+        now = time.time()
+        with self._lock:
+            self._histograms[stage].add(seconds)
+            self._items[stage] += items
+            if self._first is None:
+                self._first = now - seconds
+            self._last = now
+
+    def summary(self) -> dict:
+        """Return the statistics of every stage
+
+        Returns:
+            dict: 'wall_s' between the first and the last record, 'throughput_fps' of frames through every stage
+            over that time, and per stage in 'stages', the number of 'calls' and 'frames', the 'total_s' spent,
+            the 'p50_ms', 'p95_ms' and 'p99_ms' latencies per call and the 'frames_per_s' of the stage alone
+        """
+        with self._lock:
+            wall = self._last - self._first if self._first is not None else 0.0
+            stages = {}
+            for stage, histogram in self._histograms.items():
+                stages[stage] = {'calls': histogram.count, 'frames': self._items[stage], 'total_s': histogram.total,
+                                 'p50_ms': histogram.percentile(50) * 1000,
+                                 'p95_ms': histogram.percentile(95) * 1000,
+                                 'p99_ms': histogram.percentile(99) * 1000,
+                                 'frames_per_s': self._items[stage] / histogram.total if histogram.total else 0.0}
+            frames = self._items['nms']
+        return {'wall_s': wall, 'throughput_fps': frames / wall if wall else 0.0, 'stages': stages}
+
+    def write(self, path: str):
+        """Write the summary to a file, replacing it atomically
+
+        Args:
+            path (str): a ``.json`` file, or a Prometheus textfile for any other extension
+        """
+        summary = self.summary()
+        if path.endswith('.json'):
+            text = json.dumps(summary, indent=2)
+        else:
+            lines = ['# HELP video_toolpkg_stage_seconds Latency of a FireSmokeDetector stage per call',
+                     '# TYPE video_toolpkg_stage_seconds summary']
+            for stage, stats in summary['stages'].items():
+                for q in (50, 95, 99):
+                    lines.append(f'video_toolpkg_stage_seconds{{stage="{stage}",quantile="{q / 100}"}} '
+                                 f'{stats[f"p{q}_ms"] / 1000}')
+                lines.append(f'video_toolpkg_stage_seconds_sum{{stage="{stage}"}} {stats["total_s"]}')
+                lines.append(f'video_toolpkg_stage_seconds_count{{stage="{stage}"}} {stats["calls"]}')
+            lines += ['# HELP video_toolpkg_throughput_fps Frames per second through every stage',
+                      '# TYPE video_toolpkg_throughput_fps gauge',
+                      f'video_toolpkg_throughput_fps {summary["throughput_fps"]}']
+            text = '\n'.join(lines) + '\n'
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'  # scrapers must not read a partial file
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
@@ -0,0 +1,168 @@
+"""Quantization
+    A module for building a static post-training INT8 version of the fire/smoke model,
+    calibrated on frames sampled from your own footage, and for checking it against the FP32 model
+"""
+
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+import torch
+
+from video_toolpkg.catalog_scan import catalog_files
+from video_toolpkg.fire_smoke_detector import FireSmokeDetector
+from models.common import BottleneckCSP, Conv
+from models.experimental import attempt_load
+from utils.datasets import img_formats, letterbox
+from utils.general import check_img_size
+
+
+def sample_frames(src_dir: str, n_frames=200) -> list:
+    """Sample frames evenly from the images and videos of a directory
+
+    Args:
+        src_dir (str): a directory, glob pattern or manifest file, see :func:`~video_toolpkg.catalog_scan.catalog_files`
+        n_frames (int, optional): number of frames to sample in total, 200 by default
+
+    Returns:
+        list[np.ndarray]: sampled BGR images
+    """
+    files = catalog_files(src_dir)
+    frames = []
+    for i, path in enumerate(files):
+        n = n_frames * (i + 1) // len(files) - n_frames * i // len(files)  # share of this file
+        if not n:
+            continue
+        if os.path.splitext(path)[-1].lower() in img_formats:
+            img0 = cv2.imread(path)
+            if img0 is not None:
+                frames.append(img0)
+            continue
+        cap = cv2.VideoCapture(path)
+        count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for index in np.linspace(0, max(count - 1, 0), n).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            ret, img0 = cap.read()
+            if ret:
+                frames.append(img0)
+        cap.release()
+    return frames
+
+
+def quantize_model(weights: str, frames: list, des_path='', imgsz=640) -> str:
+    """Quantize the ``Conv`` and ``BottleneckCSP`` blocks of a trained model to INT8 with static calibration
+
+    Notes:
+        The convolutions of those blocks run in INT8 between a quantize and a dequantize step, while
+        activations, residual additions and the ``Detect`` layer stay in FP32. The result runs on CPU only
+
+    Args:
+        weights (str): path of the trained ``*.pt`` model
+        frames (list[np.ndarray]): BGR calibration images, see :func:`sample_frames`
+        des_path (str, optional): save path of the quantized model
+            By default, the extension of ``weights`` is replaced with ``.int8.pt``
+        imgsz (int, optional): image size used for calibration, 640 by default
+
+    Returns:
+        str: save path of the quantized model, loadable with ``FireSmokeDetector(weights=des_path)``
+    """
+    if not des_path:
+        des_path = os.path.splitext(weights)[0] + '.int8.pt'
+    engine = torch.backends.quantized.engine
+    qconfig = torch.quantization.get_default_qconfig(engine)
+
+    model = attempt_load(weights, map_location=torch.device('cpu'))  # fused FP32 model
+    for m in list(model.modules()):  # wrappers are added while iterating
+        if type(m) is Conv:
+            m.conv = torch.quantization.QuantWrapper(m.conv)
+            m.conv.qconfig = qconfig
+        elif type(m) is BottleneckCSP:
+            m.cv2 = torch.quantization.QuantWrapper(m.cv2)
+            m.cv3 = torch.quantization.QuantWrapper(m.cv3)
+            m.cv2.qconfig = m.cv3.qconfig = qconfig
+    torch.quantization.prepare(model, inplace=True)
+
+    # Calibrate observers
+    with torch.no_grad():
+        for img0 in frames:
+            img = letterbox(img0, new_shape=imgsz)[0]
+            img = np.ascontiguousarray(img[:, :, ::-1].transpose(2, 0, 1))  # BGR to RGB, to 3x416x416
+            model(torch.from_numpy(img).float().div(255.0).unsqueeze(0))
+
+    torch.quantization.convert(model, inplace=True)
+
+    # Save a traced module, like export_torchscript, as pickled quantized modules cannot be unpickled
+    detect = model.model[-1]
+    detect.export = True  # return the raw output of each detection layer
+    imgsz = check_img_size(imgsz, s=model.stride.max())
+    with torch.no_grad():
+        traced = torch.jit.trace(model, torch.zeros((1, 3, imgsz, imgsz)))
+    meta = {'names': list(model.names), 'stride': detect.stride.tolist(), 'anchor_grid': detect.anchor_grid.tolist(),
+            'engine': engine}
+    os.makedirs(os.path.dirname(os.path.abspath(des_path)), exist_ok=True)
+    torch.jit.save(traced, des_path, _extra_files={'meta.json': json.dumps(meta)})
+    return des_path
+
+
+def compare_models(fp32_weights: str, int8_weights: str, frames: list, imgsz=640) -> dict:
+    """Compare the decisions and CPU latency of the FP32 and INT8 models on the same frames
+
+    Args:
+        fp32_weights (str): path of the trained ``*.pt`` model
+        int8_weights (str): path of the quantized model made by :func:`quantize_model`
+        frames (list[np.ndarray]): BGR images to compare on
+        imgsz (int, optional): inference size of both models, 640 by default
+
+    Returns:
+        dict: 'frames' count, per-class 'agreement' (fraction of frames with the same decision at the default
+        thresholds) and 'mean_abs_diff' of percentages, and mean 'latency_ms' per frame of each model
+    """
+    if not frames:
+        raise ValueError(f"no frames to compare on")
+    report = {'frames': len(frames), 'agreement': {}, 'mean_abs_diff': {}, 'latency_ms': {}}
+    percents, decisions = {}, {}
+    for label, weights in (('fp32', fp32_weights), ('int8', int8_weights)):
+        detector = FireSmokeDetector(weights=weights, device='cpu', imgsz=imgsz)
+        try:
+            detector.percent_from_read(frames[0])  # warm up
+            t = time.time()
+            percents[label] = np.stack([detector.percent_from_read(img0) for img0 in frames])
+            report['latency_ms'][label] = (time.time() - t) * 1000 / len(frames)
+            names = detector.names
+            decisions[label] = np.zeros((len(frames), len(names)), dtype=bool)
+            for column, name in enumerate(names):
+                decisions[label][detector.frames_from_percent(percents[label], name), column] = True
+        finally:
+            detector.release()
+
+    for column, name in enumerate(names):
+        diff = percents['fp32'][:, column].astype(int) - percents['int8'][:, column]
+        report['agreement'][name] = float(np.mean(decisions['fp32'][:, column] == decisions['int8'][:, column]))
+        report['mean_abs_diff'][name] = float(np.abs(diff).mean())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Quantize the fire/smoke model to INT8 and compare it with FP32')
+    parser.add_argument('weights', type=str, help='trained *.pt model')
+    parser.add_argument('source', type=str, help='directory, glob pattern or manifest of calibration footage')
+    parser.add_argument('--frames', type=int, default=200, help='number of calibration frames')
+    parser.add_argument('--img-size', type=int, default=640, help='calibration and comparison image size')
+    parser.add_argument('--report', type=str, default='', help='JSON file to write the comparison report to')
+    opt = parser.parse_args()
+
+    frames = sample_frames(opt.source, opt.frames)
+    des_path = quantize_model(opt.weights, frames, imgsz=opt.img_size)
+    print(f'INT8 model saved as {des_path}')
+    report = compare_models(opt.weights, des_path, frames, imgsz=opt.img_size)
+    print(json.dumps(report, indent=2))
+    if opt.report:
+        with open(opt.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""StreamMonitor
+    A module for watching several live camera streams for fire and smoke in a single process,
+    always inferring the latest frame of each stream so that slow inference never builds a backlog
+"""
+
+import argparse
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from video_toolpkg.fire_smoke_detector import FireSmokeDetector
+
+
+class StreamMonitor:
+    """:class:`StreamMonitor` runs a :class:`FireSmokeDetector` continuously on the latest frame of several streams
+
+    Every stream is read in a daemon thread that only keeps its newest frame, like ``LoadStreams`` of YOLOv5.
+    Each round, the new frames of all streams are inferred in one batch, so frames that arrive while the model is
+    busy are dropped rather than queued. An alert of a class is raised for a stream once the class is detected in
+    ``alert_frames`` consecutive inferred frames and cleared after ``clear_frames`` consecutive frames without it.
+
+    Args:
+        detector (FireSmokeDetector): detector used for every stream
+        sources (list[str]): stream URLs, camera indices such as '0', or video files
+        loop (bool, optional): restart video files when they end so that they act as fake streams, False by default
+        alert_frames (int, optional): consecutive detections needed to raise an alert, 3 by default
+        clear_frames (int, optional): consecutive frames without detection needed to clear an alert, 3 by default
+        on_alert (callable, optional): called with the source, the class name, whether the alert is raised or
+            cleared and the percentage of the frame that changed it. By default, alerts are printed
+
+    """
+    def __init__(self, detector: FireSmokeDetector, sources: list, loop=False, alert_frames=3, clear_frames=3,
+                 on_alert=None):
+        """Initialize the :class:`StreamMonitor` object."""
+        if type(sources) is not list or not sources:
+            raise TypeError(f"'{sources}' is not a non-empty list")
+        for value in (alert_frames, clear_frames):
+            if type(value) is not int:
+                raise TypeError(f"'{value}' is not int but {type(value)}")
+            if value <= 0:
+                raise ValueError(f"number of frames must be positive")
+
+        self._detector = detector
+        self._alert_frames = alert_frames
+        self._clear_frames = clear_frames
+        self._on_alert = on_alert or self.__print_alert
+        self._stop = threading.Event()
+        self._readers = []
+        try:
+            for source in sources:
+                self._readers.append(_StreamReader(str(source), loop, self._stop))
+        except ValueError:
+            self._stop.set()  # stop the streams already opened
+            raise
+
+        n_classes = len(detector.names)
+        self._streaks = np.zeros((len(sources), n_classes), dtype=int)  # > 0 detected, < 0 not detected in a row
+        self._alerts = np.zeros((len(sources), n_classes), dtype=bool)
+        self._stats = [{'frames': 0, 'dropped': 0, 'fps': 0.0, 'latency_ms': 0.0} for _ in sources]
+        self._last_seq = [0] * len(sources)
+        self._last_time = [None] * len(sources)
+
+    @property
+    def sources(self) -> list:
+        """list[str]: Sources of the streams"""
+        return [reader.source for reader in self._readers]
+
+    @property
+    def alerts(self) -> dict:
+        """dict: Class names currently in alert for each source"""
+        return {reader.source: [name for name, on in zip(self._detector.names, alerts) if on]
+                for reader, alerts in zip(self._readers, self._alerts)}
+
+    def stats(self) -> dict:
+        """Return the statistics of each stream
+
+        Returns:
+            dict: for each source, the number of inferred 'frames', the number of frames 'dropped' in favour of a
+            newer frame, and the moving average of the inferred 'fps' and of the 'latency_ms' from capture to result
+        """
+        return {reader.source: dict(stats) for reader, stats in zip(self._readers, self._stats)}
+
+    def run(self, duration=None):
+        """Monitor the streams until :meth:`stop` is called, every stream has ended or ``duration`` has passed
+
+        Args:
+            duration (float, optional): number of seconds to run for. By default, there is no limit
+        """
+        end = None if duration is None else time.time() + duration
+        while not self._stop.is_set() and (end is None or time.time() < end):
+            batch = []
+            for k, reader in enumerate(self._readers):
+                seq, img0, captured = reader.latest()
+                if seq != self._last_seq[k]:
+                    self._stats[k]['dropped'] += seq - self._last_seq[k] - 1
+                    self._last_seq[k] = seq
+                    batch.append((k, img0, captured))
+            if not batch:
+                if not any(reader.alive for reader in self._readers):
+                    break
+                time.sleep(0.005)  # wait for a new frame
+                continue
+
+            percents = self._detector.percent_from_reads([img0 for _, img0, _ in batch])
+            self.__update([k for k, _, _ in batch], [captured for _, _, captured in batch], percents)
+
+    def stop(self):
+        """Stop :meth:`run` and the reader threads of the streams"""
+        self._stop.set()
+
+    def __update(self, streams, captured, percents):
+        """Private Method to update the statistics and alerts of the streams of an inferred batch"""
+        now = time.time()
+        for k, t in zip(streams, captured):
+            stats = self._stats[k]
+            stats['frames'] += 1
+            stats['latency_ms'] = _ema(stats['latency_ms'], (now - t) * 1000, stats['frames'])
+            if self._last_time[k] is not None:
+                stats['fps'] = _ema(stats['fps'], 1 / max(now - self._last_time[k], 1e-6), stats['frames'] - 1)
+            self._last_time[k] = now
+
+        detected = np.zeros((len(streams), len(self._detector.names)), dtype=bool)
+        for column, name in enumerate(self._detector.names):
+            detected[self._detector.frames_from_percent(percents, name), column] = True
+        streaks = self._streaks[streams]
+        streaks = np.where(detected, np.maximum(streaks, 0) + 1, np.minimum(streaks, 0) - 1)
+        self._streaks[streams] = streaks
+
+        raised = ~self._alerts[streams] & (streaks >= self._alert_frames)
+        cleared = self._alerts[streams] & (streaks <= -self._clear_frames)
+        for row, column in zip(*np.nonzero(raised | cleared)):
+            k = streams[row]
+            self._alerts[k, column] = raised[row, column]
+            self._on_alert(self._readers[k].source, self._detector.names[column], bool(raised[row, column]),
+                           int(percents[row, column]))
+
+    @staticmethod
+    def __print_alert(source, name, raised, percent):
+        """Private Method to print an alert"""
+        state = 'RAISED' if raised else 'cleared'
+        print(f'{time.strftime("%H:%M:%S")} {source}: {name} alert {state} ({percent}%)')
+
+
+class _StreamReader:
+    """Read a stream in a daemon thread, keeping only its latest frame"""
+    def __init__(self, source, loop, stop):
+        cap = cv2.VideoCapture(0 if source == '0' else source)
+        if not cap.isOpened():
+            raise ValueError(f'failed to open {source}')
+        self.source = source
+        self._lock = threading.Lock()
+        self._seq, self._img0, self._time = 0, None, None
+        # Files are paced at their frame rate to behave like a live stream
+        fps = cap.get(cv2.CAP_PROP_FPS) if os.path.isfile(source) else 0
+        self._thread = threading.Thread(target=self.__update, args=(cap, loop, stop, fps), daemon=True)
+        self._thread.start()
+
+    @property
+    def alive(self) -> bool:
+        return self._thread.is_alive()
+
+    def latest(self) -> tuple:
+        """Return the sequence number, BGR image and capture time of the latest frame"""
+        with self._lock:
+            return self._seq, self._img0, self._time
+
+    def __update(self, cap, loop, stop, fps):
+        next_time = time.time()
+        try:
+            while not stop.is_set():
+                ret, img0 = cap.read()
+                if not ret:
+                    if loop and self._seq:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    break
+                with self._lock:
+                    self._seq, self._img0, self._time = self._seq + 1, img0, time.time()
+                if fps:
+                    next_time += 1 / fps
+                    time.sleep(max(next_time - time.time(), 0))
+        finally:
+            cap.release()
+
+
+def _ema(average, value, count, alpha=0.1):
+    """Return the exponential moving average after a new value, the plain mean for the first values"""
+    return value if count <= 1 else average + max(alpha, 1 / count) * (value - average)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch live streams for fire and smoke')
+    parser.add_argument('sources', type=str, nargs='+', help='stream URLs, camera indices or video files')
+    parser.add_argument('--weights', type=str, default='', help='trained model, FIRE_SMOKE_WEIGHTS by default')
+    parser.add_argument('--device', type=str, default='', help='cuda device, i.e. 0 or cpu')
+    parser.add_argument('--loop', action='store_true', help='loop video files as fake streams')
+    parser.add_argument('--duration', type=float, default=None, help='seconds to run for')
+    parser.add_argument('--stats-interval', type=float, default=10, help='seconds between statistics reports')
+    opt = parser.parse_args()
+
+    monitor = StreamMonitor(FireSmokeDetector(weights=opt.weights, device=opt.device), opt.sources, loop=opt.loop)
+
+    done = threading.Event()
+
+    def report():
+        while not done.wait(opt.stats_interval):
+            for source, stats in monitor.stats().items():
+                print(f"{source}: {stats['fps']:.1f} FPS, {stats['latency_ms']:.0f} ms, "
+                      f"{stats['frames']} frames, {stats['dropped']} dropped")
+
+    threading.Thread(target=report, daemon=True).start()
+    try:
+        monitor.run(opt.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        done.set()
+        monitor.stop()
+
+
+if __name__ == '__main__':
+    main()
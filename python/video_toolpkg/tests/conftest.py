@@ -0,0 +1,82 @@
+"""Shared fixtures of the video_toolpkg tests
+
+The directory holding ``video_toolpkg`` is put on ``sys.path``, so the tests run from any working directory.
+The package itself needs numpy and OpenCV, so no test is collected without them, and tests needing torch
+are skipped where it is not installed.
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PYTHON_DIR not in sys.path:
+    sys.path.insert(0, PYTHON_DIR)
+
+if any(importlib.util.find_spec(module) is None for module in ('numpy', 'cv2')):
+    collect_ignore_glob = ['test_*.py']  # pytest would import video_toolpkg to set up any test of the directory
+
+
+@pytest.fixture(scope='session')
+def random_weights(tmp_path_factory):
+    """Path of a randomly initialised fire/smoke model, see :func:`video_toolpkg.benchmark.make_model`"""
+    pytest.importorskip('torch')
+    pytest.importorskip('yaml')
+    from video_toolpkg.benchmark import make_model
+
+    return make_model(str(tmp_path_factory.mktemp('weights') / 'random.pt'))
+
+
+@pytest.fixture
+def detector(random_weights, monkeypatch):
+    """A CPU :class:`FireSmokeDetector` with the classes 'fire' and 'smoke', released after the test"""
+    from video_toolpkg.fire_smoke_detector import FireSmokeDetector
+
+    # YOLOv5 pickles whole models, which torch 2.6 and later only unpickle when asked to
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    detector = FireSmokeDetector(weights=random_weights, device='cpu', imgsz=64)
+    yield detector
+    detector.release()
+
+
+@pytest.fixture(scope='session')
+def varying_weights(random_weights, tmp_path_factory):
+    """Path of the random model with He initialised convolutions and raised class biases,
+    whose percentages vary from frame to frame around the default thresholds at imgsz 64"""
+    import torch
+
+    ckpt = torch.load(random_weights, map_location='cpu', weights_only=False)
+    model = ckpt['model']
+    detect = model.model[-1]
+    torch.manual_seed(0)
+    for m in model.modules():  # with the default init, activations fade out before reaching Detect
+        if isinstance(m, torch.nn.Conv2d) and m not in detect.m:
+            torch.nn.init.kaiming_normal_(m.weight, a=0.1, nonlinearity='leaky_relu')
+    with torch.no_grad():
+        for conv in detect.m:
+            conv.bias.view(detect.na, -1)[:, 5:] += 2  # class logits
+    path = str(tmp_path_factory.mktemp('weights') / 'varying.pt')
+    torch.save(ckpt, path)
+    return path
+
+
+@pytest.fixture(scope='session')
+def video(tmp_path_factory):
+    """Path of a 24-frame synthetic video of 160x96 pixels, see :func:`video_toolpkg.benchmark.make_video`"""
+    pytest.importorskip('torch')
+    from video_toolpkg.benchmark import make_video
+
+    return make_video(str(tmp_path_factory.mktemp('videos') / 'synthetic.avi'), width=160, height=96, n_frames=24)
+
+
+@pytest.fixture
+def varying_detector(varying_weights, monkeypatch):
+    """A CPU :class:`FireSmokeDetector` of ``varying_weights``, released after the test"""
+    from video_toolpkg.fire_smoke_detector import FireSmokeDetector
+
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    detector = FireSmokeDetector(weights=varying_weights, device='cpu', imgsz=64)
+    yield detector
+    detector.release()
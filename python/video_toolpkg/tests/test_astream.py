@@ -0,0 +1,84 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+pytest.importorskip('torch')
+
+from video_toolpkg import fire_smoke_detector  # noqa: E402
+
+
+@pytest.fixture
+def letterboxed(monkeypatch):
+    """Number of frames letterboxed so far, in a list"""
+    count = [0]
+    letterbox = fire_smoke_detector.letterbox
+
+    def counting(*args, **kwargs):
+        count[0] += 1
+        return letterbox(*args, **kwargs)
+
+    monkeypatch.setattr(fire_smoke_detector, 'letterbox', counting)
+    return count
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+@pytest.mark.parametrize('pipeline_workers', [0, 2])
+def test_astream_yields_frames_in_order(varying_detector, video, pipeline_workers):
+    dense = varying_detector.percent_from_path(video)
+    varying_detector.batch_size = 3
+    varying_detector.pipeline_workers = pipeline_workers
+
+    items = asyncio.run(collect(varying_detector.astream(video, max_in_flight=2)))
+    assert [i for i, _ in items] == list(range(len(dense)))
+    np.testing.assert_array_equal(np.stack([percents for _, percents in items]), dense)
+
+    items = asyncio.run(collect(varying_detector.astream(video, start=5, stop=12)))
+    assert [i for i, _ in items] == list(range(5, 12))
+    np.testing.assert_array_equal(np.stack([percents for _, percents in items]), dense[5:12])
+
+
+def test_closing_astream_stops_the_scan(varying_detector, video, letterboxed):
+    async def take(n):
+        stream = varying_detector.astream(video, max_in_flight=2)
+        taken = []
+        async for i, _ in stream:
+            taken.append(i)
+            if len(taken) == n:
+                break
+            await asyncio.sleep(0.3)  # a slow consumer, the scan waits for it
+        await stream.aclose()  # returns once the scan has stopped
+        count = letterboxed[0]
+        await asyncio.sleep(0.3)
+        assert letterboxed[0] == count
+        return taken
+
+    assert asyncio.run(take(3)) == [0, 1, 2]
+    assert letterboxed[0] <= 3 + 2 + 2  # taken, waiting, and the frames waiting for a slot and closing its batch
+
+
+def test_cancelling_the_consumer_stops_the_scan(varying_detector, video, letterboxed):
+    async def consume(taken):
+        async for i, _ in varying_detector.astream(video, max_in_flight=2):
+            taken.append(i)
+            await asyncio.sleep(10)
+
+    async def cancel_after_first_frame():
+        taken = []
+        task = asyncio.create_task(consume(taken))
+        while not taken:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.3)  # the scan waits for the consumer
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        count = letterboxed[0]
+        await asyncio.sleep(0.3)
+        assert letterboxed[0] == count
+        return taken
+
+    assert asyncio.run(cancel_after_first_frame()) == [0]
+    assert letterboxed[0] <= 1 + 2 + 2
@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip('torch')
+
+from video_toolpkg.benchmark import make_video, run_benchmark  # noqa: E402
+
+
+def test_run_benchmark_on_a_tiny_video(random_weights, tmp_path, monkeypatch):
+    monkeypatch.delenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', raising=False)  # the workers must not need it
+    video = make_video(str(tmp_path / 'tiny.avi'), width=64, height=48, n_frames=4)
+    results = run_benchmark(random_weights, video, batch_sizes=(1, 2), imgszs=(64,), threads=(1,), trusted=True)
+    assert [(r['batch_size'], r['imgsz'], r['threads']) for r in results] == [(1, 64, 1), (2, 64, 1)]
+    for r in results:
+        assert r['frames'] == 4
+        assert r['fps'] > 0 and r['peak_rss_mb'] > 0
+        assert 'forward' in r['stages']
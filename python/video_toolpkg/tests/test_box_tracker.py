@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from video_toolpkg.box_tracker import track_boxes
+
+
+@pytest.fixture
+def noise():
+    return np.random.default_rng(0).integers(0, 256, (120, 160), dtype=np.uint8)
+
+
+def test_boxes_follow_a_shift(noise):
+    shifted = np.roll(noise, (3, 5), axis=(0, 1))  # 3 pixels down, 5 pixels right
+    boxes = np.array([[40, 30, 80, 70, 0.9, 0], [100, 60, 130, 100, 0.5, 1]], dtype=np.float32)
+    tracked = track_boxes(noise, shifted, boxes)
+    np.testing.assert_array_equal(tracked[:, :4], boxes[:, :4] + [5, 3, 5, 3])
+    np.testing.assert_array_equal(tracked[:, 4:], boxes[:, 4:])
+    assert boxes[0, 0] == 40  # the input is not modified
+
+
+def test_unmatched_content_is_not_tracked(noise):
+    other = np.random.default_rng(1).integers(0, 256, noise.shape, dtype=np.uint8)
+    boxes = np.array([[40, 30, 80, 70, 0.9, 0]], dtype=np.float32)
+    assert track_boxes(noise, other, boxes) is None
+
+
+def test_tiny_boxes_are_not_tracked(noise):
+    boxes = np.array([[40, 30, 42, 70, 0.9, 0]], dtype=np.float32)
+    assert track_boxes(noise, noise, boxes) is None
+
+
+def test_no_boxes(noise):
+    assert len(track_boxes(noise, noise, np.zeros((0, 6), dtype=np.float32))) == 0
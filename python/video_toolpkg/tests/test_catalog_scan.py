@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+pytest.importorskip('torch')
+
+from video_toolpkg.catalog_scan import CatalogScanner  # noqa: E402
+
+
+def write_results(path, records, tail=''):
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records) + tail)
+
+
+def test_done_skips_a_cut_record(tmp_path):
+    results = tmp_path / 'results.jsonl'
+    write_results(results, [{'path': '/a.mp4', 'frames': 3}], tail='{"path": "/b.mp4", "fra')
+    assert CatalogScanner(str(results)).done() == {'/a.mp4'}
+
+
+def test_scan_cuts_a_partial_last_line(tmp_path):
+    results = tmp_path / 'results.jsonl'
+    write_results(results, [{'path': '/a.mp4', 'frames': 3}], tail='{"path": "/b.mp4", "frames": 1}')
+    empty = tmp_path / 'empty'
+    empty.mkdir()
+    assert CatalogScanner(str(results)).scan(str(empty)) == 0
+    assert results.read_text() == json.dumps({'path': '/a.mp4', 'frames': 3}) + '\n'
+
+
+def test_retry_errors(tmp_path):
+    results = tmp_path / 'results.jsonl'
+    write_results(results, [{'path': '/a.mp4', 'error': 'cannot read'}, {'path': '/b.mp4', 'error': 'cannot read'},
+                            {'path': '/b.mp4', 'frames': 3}, {'path': '/c.mp4', 'frames': 1}])
+    assert CatalogScanner(str(results)).done() == {'/a.mp4', '/b.mp4', '/c.mp4'}
+    assert CatalogScanner(str(results), retry_errors=True).done() == {'/b.mp4', '/c.mp4'}
+
+
+def test_scan_packs_short_files_and_scans_long_ones(tmp_path, random_weights, monkeypatch):
+    import cv2
+    import numpy as np
+    from video_toolpkg.benchmark import make_video
+
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')  # inherited by the spawned workers
+    catalog = tmp_path / 'catalog'
+    catalog.mkdir()
+    for i in range(3):
+        cv2.imwrite(str(catalog / f'{i}.jpg'), np.full((48, 64, 3), 40 * i, np.uint8))
+    make_video(str(catalog / 'short.avi'), width=64, height=48, n_frames=2)
+    make_video(str(catalog / 'long.avi'), width=64, height=48, n_frames=6)
+
+    results = tmp_path / 'results.jsonl'
+    scanner = CatalogScanner(str(results), group_frames=4, settings={'imgsz': 64}, weights=random_weights,
+                             device='cpu')
+    assert scanner.scan(str(catalog)) == 5
+    records = {record['path']: record for record in map(json.loads, results.read_text().splitlines())}
+    frames = {name: records[str(catalog / name)]['frames'] for name in ('0.jpg', '1.jpg', '2.jpg', 'short.avi',
+                                                                         'long.avi')}
+    assert frames == {'0.jpg': 1, '1.jpg': 1, '2.jpg': 1, 'short.avi': 2, 'long.avi': 6}
+    assert scanner.scan(str(catalog)) == 0
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from video_toolpkg.color_prefilter import color_fractions
+
+
+def solid(bgr, size=32):
+    return np.full((size, size, 3), bgr, dtype=np.uint8)
+
+
+@pytest.mark.parametrize('bgr', [(0, 128, 255), (0, 0, 230), (20, 2, 230), (40, 0, 200)])
+def test_fire_colors(bgr):
+    """Orange, red and red hues wrapping around H 180 all count as fire"""
+    assert color_fractions(solid(bgr)) == (1.0, 0.0)
+
+
+def test_smoke_colors():
+    assert color_fractions(solid((150, 150, 150))) == (0.0, 1.0)
+
+
+def test_other_colors():
+    assert color_fractions(solid((200, 60, 20))) == (0.0, 0.0)  # blue
+    assert color_fractions(solid((10, 10, 10))) == (0.0, 0.0)  # black
+
+
+def test_fractions_of_a_split_frame():
+    img = solid((150, 150, 150), 64)
+    img[:, :16] = (20, 2, 230)
+    assert color_fractions(img) == (0.25, 0.75)
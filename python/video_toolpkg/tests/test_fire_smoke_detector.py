@@ -0,0 +1,129 @@
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip('torch')
+
+from video_toolpkg.fire_smoke_detector import tile_grid  # noqa: E402
+
+
+def fire_percents(fire):
+    """(n_frames, 2) percentages in the column order of the random model, with no smoke"""
+    return np.stack([np.array(fire, dtype=np.uint8), np.zeros(len(fire), dtype=np.uint8)], axis=1)
+
+
+def test_tile_grid_ends_at_the_borders():
+    grid = tile_grid((100, 250), 64, 16)
+    assert grid == [(x, y) for y in (0, 36) for x in (0, 48, 96, 144, 186)]
+
+
+def test_tile_grid_of_a_frame_smaller_than_a_tile():
+    assert tile_grid((30, 40), 64, 16) == [(0, 0)]
+
+
+def test_tile_grid_keeps_tiles_in_the_mask():
+    mask = np.zeros((2, 2), dtype=np.uint8)
+    mask[0, 0] = 1  # top-left quarter of the frame
+    grid = tile_grid((128, 256), 64, 0, mask)
+    assert grid == [(0, 0), (64, 0)]
+
+
+@pytest.mark.parametrize('overlap', [-1, 64, 100])
+def test_tile_grid_rejects_overlap_outside_tile(overlap):
+    with pytest.raises(ValueError):
+        tile_grid((100, 100), 64, overlap)
+
+
+def test_tile_overlap_must_be_smaller_than_tile_size(detector):
+    with pytest.raises(ValueError):
+        detector.tile_size = 64  # the default overlap is 64
+    detector.tile_overlap = 16
+    detector.tile_size = 64
+    with pytest.raises(ValueError):
+        detector.tile_overlap = 64
+    assert (detector.tile_size, detector.tile_overlap) == (64, 16)
+
+
+def test_segments(detector):
+    segments = detector.segments_from_percent(fire_percents([0, 70, 70, 0, 0, 80, 0]), 'fire', fps=10)
+    assert segments == [{'start': 1, 'end': 2, 'start_time': 0.1, 'end_time': 0.3, 'peak': 70},
+                        {'start': 5, 'end': 5, 'start_time': 0.5, 'end_time': 0.6, 'peak': 80}]
+    assert detector.segments_from_percent(fire_percents([0, 0]), 'fire') == []
+    assert detector.segments_from_percent(fire_percents([0, 70]), 'smoke') == []
+
+
+def test_segments_with_hysteresis(detector):
+    percents = fire_percents([0, 70, 50, 70, 50, 30, 50])
+    assert [(s['start'], s['end']) for s in detector.segments_from_percent(percents, 'fire')] == [(1, 1), (3, 3)]
+    assert [(s['start'], s['end']) for s in detector.segments_from_percent(percents, 'fire', exit=40)] == [(1, 4)]
+
+    detector.f_exit_threshold = 40
+    assert [(s['start'], s['end']) for s in detector.segments_from_percent(percents, 'fire')] == [(1, 4)]
+
+
+def test_segments_minimum_duration(detector):
+    percents = fire_percents([70, 0, 70, 70, 70, 0])
+    assert [s['start'] for s in detector.segments_from_percent(percents, 'fire', min_frames=2)] == [2]
+    detector.min_event_frames = 4
+    assert detector.segments_from_percent(percents, 'fire') == []
+
+
+def test_segments_thresholds(detector):
+    percents = fire_percents([50, 50])
+    assert detector.segments_from_percent(percents, 'fire') == []
+    assert len(detector.segments_from_percent(percents, 'fire', enter=50)) == 1
+    detector.f_threshold = 50
+    assert len(detector.segments_from_percent(percents, 'fire')) == 1
+
+    with pytest.raises(ValueError):
+        detector.segments_from_percent(percents, 'fire', enter=50, exit=60)
+    with pytest.raises(TypeError):
+        detector.segments_from_percent(percents, 'person')
+
+
+def test_frames_from_percent(detector):
+    percents = fire_percents([10, 60, 90])
+    np.testing.assert_array_equal(detector.frames_from_percent(percents, 'fire'), [1, 2])
+    low, high = detector.frames_from_percent(percents, 'fire', [10, 90])
+    np.testing.assert_array_equal(low, [0, 1, 2])
+    np.testing.assert_array_equal(high, [2])
+
+
+def test_class_thresholds_are_validated(detector):
+    with pytest.raises(ValueError):
+        detector.class_thresholds = {'fire': 50}
+    with pytest.raises(ValueError):
+        detector.class_thresholds = {'person': 101}
+    with pytest.raises(TypeError):
+        detector.class_thresholds = {'person': 0.5}
+
+
+def test_roi_masks_of_other_shapes_are_cached_apart(detector, tmp_path):
+    from video_toolpkg.inference_cache import InferenceCache
+
+    img_path = str(tmp_path / 'frame.png')
+    cv2.imwrite(img_path, np.random.default_rng(0).integers(0, 256, (128, 128, 3), dtype=np.uint8))
+    detector.cache = InferenceCache(str(tmp_path / 'cache.sqlite'))
+    detector.tile_overlap = 0
+    detector.tile_size = 64
+    mask = np.zeros(16, dtype=np.uint8)
+    mask[:2] = 1
+    for shape in ((2, 8), (4, 4)):
+        detector.roi_mask = mask.reshape(shape)
+        detector.percent_from_path(img_path)
+    assert len(detector.cache.entries()) == 2
+
+
+def test_percentages_are_the_best_confidence_nms_keeps(varying_detector, video):
+    cap = cv2.VideoCapture(video)
+    frames = [cap.read()[1] for _ in range(24)]
+    cap.release()
+    for img0 in frames:
+        boxes = varying_detector.boxes_from_read(img0)
+        expected = np.zeros(len(varying_detector.names), dtype=np.uint8)
+        for column in range(len(expected)):
+            conf = boxes[boxes[:, 5] == column, 4]
+            if len(conf):
+                expected[column] = np.uint8(conf.max() * np.float32(100))
+        np.testing.assert_array_equal(varying_detector.percent_from_read(img0), expected)
+        assert expected.any()
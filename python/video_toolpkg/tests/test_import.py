@@ -0,0 +1,26 @@
+"""Importing the package must stay cheap: torch and YOLOv5 are only loaded on first use of the detector"""
+
+import os
+import subprocess
+import sys
+
+from conftest import PYTHON_DIR
+
+IMPORT_BUDGET_S = 2.0  # seconds, cold import of the package with numpy and OpenCV
+
+CODE = '''
+import sys, time
+t = time.perf_counter()
+import video_toolpkg
+elapsed = time.perf_counter() - t
+assert 'FireSmokeDetector' in dir(video_toolpkg)
+print(elapsed, 'torch' in sys.modules)
+'''
+
+
+def test_import_does_not_load_torch():
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [PYTHON_DIR, os.environ.get('PYTHONPATH')])))
+    out = subprocess.run([sys.executable, '-c', CODE], env=env, capture_output=True, text=True, check=True)
+    elapsed, torch_loaded = out.stdout.split()
+    assert torch_loaded == 'False'
+    assert float(elapsed) < IMPORT_BUDGET_S
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from video_toolpkg import fire_smoke_detector  # noqa: E402
+from video_toolpkg.fire_smoke_detector import FireSmokeDetector  # noqa: E402
+from video_toolpkg.inference_backends import TorchScriptModel, export_torchscript  # noqa: E402
+
+
+def test_torchscript_predictions_match_eager(varying_weights, tmp_path, monkeypatch):
+    from models.experimental import attempt_load
+
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    model = attempt_load(varying_weights, map_location=torch.device('cpu'))
+    traced = TorchScriptModel(export_torchscript(varying_weights, str(tmp_path / 'varying.torchscript.pt'), imgsz=64))
+    assert traced.names == model.names
+    img = torch.rand((2, 3, 64, 96), generator=torch.Generator().manual_seed(0))  # not the traced shape
+    with torch.no_grad():
+        torch.testing.assert_close(traced(img)[0], model(img)[0], rtol=1e-4, atol=1e-4)
+
+
+def test_torchscript_scan_matches_eager(varying_detector, varying_weights, video, tmp_path, monkeypatch):
+    monkeypatch.setattr(fire_smoke_detector, 'TORCHSCRIPT_DIR', str(tmp_path))
+    dense = varying_detector.percent_from_path(video)
+    detector = FireSmokeDetector(weights=varying_weights, device='cpu', imgsz=64, torchscript=True)
+    try:
+        np.testing.assert_array_equal(detector.percent_from_path(video), dense)
+    finally:
+        detector.release()
+    assert len(list(tmp_path.iterdir())) == 1  # the export is kept for the next detector
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from video_toolpkg import inference_cache
+from video_toolpkg.inference_cache import InferenceCache
+
+NAMES = ['fire', 'smoke']
+
+
+class _Clock:
+    """Stand-in for the time module that advances one second per call, so access times never tie"""
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    monkeypatch.setattr(inference_cache, 'time', _Clock())
+
+
+def percents(n_frames=100):
+    return np.arange(n_frames * len(NAMES), dtype=np.uint8).reshape(n_frames, len(NAMES))
+
+
+def entry_size(tmp_path):
+    cache = InferenceCache(str(tmp_path / 'size.sqlite'))
+    cache.put('key', 'video.mp4', NAMES, percents())
+    return cache.entries()[0]['nbytes']
+
+
+def test_get_returns_what_was_put(tmp_path):
+    cache = InferenceCache(str(tmp_path / 'cache.sqlite'))
+    assert cache.get('a') is None
+    cache.put('a', 'video.mp4', NAMES, percents())
+    names, result = cache.get('a')
+    assert names == NAMES
+    np.testing.assert_array_equal(result, percents())
+
+
+def test_put_evicts_least_recently_used(tmp_path):
+    nbytes = entry_size(tmp_path)
+    cache = InferenceCache(str(tmp_path / 'cache.sqlite'), max_bytes=2 * nbytes)
+    for key in 'abc':
+        cache.put(key, 'video.mp4', NAMES, percents())
+    assert [entry['key'] for entry in cache.entries()] == ['c', 'b']
+
+
+def test_get_refreshes_an_entry(tmp_path):
+    nbytes = entry_size(tmp_path)
+    cache = InferenceCache(str(tmp_path / 'cache.sqlite'), max_bytes=3 * nbytes)
+    for key in 'abc':
+        cache.put(key, 'video.mp4', NAMES, percents())
+    cache.get('a')
+    assert cache.prune(2 * nbytes) == 1
+    assert [entry['key'] for entry in cache.entries()] == ['a', 'c']
+    assert cache.prune(0) == 2
+    assert cache.entries() == []
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from video_toolpkg.profiling import LatencyHistogram, StageProfiler
+
+BIN_WIDTH = 0.08  # relative width of a bin of the default histogram is about 7%
+
+
+def test_percentile_of_empty_histogram():
+    assert LatencyHistogram().percentile(50) == 0.0
+
+
+def test_percentile_of_constant_durations():
+    histogram = LatencyHistogram()
+    for _ in range(1000):
+        histogram.add(0.01)
+    for q in (1, 50, 99, 100):
+        assert histogram.percentile(q) == pytest.approx(0.01, rel=BIN_WIDTH)
+    assert histogram.count == 1000
+    assert histogram.total == pytest.approx(10.0)
+
+
+def test_percentile_of_two_modes():
+    histogram = LatencyHistogram()
+    for seconds in [0.001] * 90 + [0.1] * 10:
+        histogram.add(seconds)
+    assert histogram.percentile(50) == pytest.approx(0.001, rel=BIN_WIDTH)
+    assert histogram.percentile(90) == pytest.approx(0.001, rel=BIN_WIDTH)
+    assert histogram.percentile(95) == pytest.approx(0.1, rel=BIN_WIDTH)
+
+
+def test_durations_out_of_range_are_counted():
+    histogram = LatencyHistogram(low=1e-3, high=1.0)
+    histogram.add(1e-6)
+    histogram.add(10.0)
+    assert histogram.count == 2
+    assert histogram.percentile(50) == pytest.approx(1e-3)
+
+
+def test_stage_profiler_summary(tmp_path):
+    profiler = StageProfiler()
+    for _ in range(4):
+        profiler.record('forward', 0.02, items=8)
+    stats = profiler.summary()['stages']['forward']
+    assert stats['calls'] == 4
+    assert stats['frames'] == 32
+    assert stats['p50_ms'] == pytest.approx(20, rel=BIN_WIDTH)
+
+    path = tmp_path / 'profile.prom'
+    profiler.write(str(path))
+    assert 'video_toolpkg_stage_seconds_count{stage="forward"} 4' in path.read_text()
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('torch')
+
+from video_toolpkg.fire_smoke_detector import FireSmokeDetector  # noqa: E402
+from video_toolpkg.quantization import compare_models, quantize_model  # noqa: E402
+
+
+@pytest.fixture
+def frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (48, 64, 3), dtype=np.uint8) for _ in range(4)]
+
+
+def test_quantized_model_reloads_and_infers(random_weights, frames, tmp_path, monkeypatch):
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    path = quantize_model(random_weights, frames, des_path=str(tmp_path / 'random.int8.pt'), imgsz=64)
+    detector = FireSmokeDetector(weights=path, device='cpu', imgsz=64)
+    try:
+        assert detector.names == ['fire', 'smoke']
+        percents = detector.percent_from_reads(frames)
+        assert percents.shape == (len(frames), 2)
+    finally:
+        detector.release()
+
+
+def test_compare_models(random_weights, frames, tmp_path, monkeypatch):
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    path = quantize_model(random_weights, frames, des_path=str(tmp_path / 'random.int8.pt'), imgsz=64)
+    report = compare_models(random_weights, path, frames, imgsz=64)
+    assert report['frames'] == len(frames)
+    assert set(report['agreement']) == {'fire', 'smoke'}
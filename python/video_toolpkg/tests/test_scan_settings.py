@@ -0,0 +1,112 @@
+"""Scans with speed settings must give the same percentages as a dense scan of every frame with batch size 1"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('torch')
+
+
+@pytest.fixture
+def dense(varying_detector, video):
+    percents = varying_detector.percent_from_path(video)
+    assert len(np.unique(percents[:, 0])) > 1  # otherwise the comparisons below prove nothing
+    return percents
+
+
+@pytest.mark.parametrize('batch_size', [1, 3, 8])
+def test_batch_size_matches_dense_scan(varying_detector, video, dense, batch_size):
+    varying_detector.batch_size = batch_size
+    np.testing.assert_array_equal(varying_detector.percent_from_path(video), dense)
+
+
+@pytest.mark.parametrize('sample_step, sample_tolerance', [(2, 0), (4, 0), (4, 2), (8, 3)])
+def test_sampled_boundaries_are_within_tolerance(varying_detector, video, dense, sample_step, sample_tolerance):
+    varying_detector.sample_step = sample_step
+    varying_detector.sample_tolerance = sample_tolerance
+    sampled = varying_detector.percent_from_path(video)
+    assert varying_detector.scan_stats['inferred'] < len(dense)
+    for name in varying_detector.names:
+        expected = varying_detector.segments_from_percent(dense, name)
+        found = varying_detector.segments_from_percent(sampled, name)
+        assert len(found) == len(expected)
+        for segment, reference in zip(found, expected):
+            assert abs(segment['start'] - reference['start']) <= sample_tolerance
+            assert abs(segment['end'] - reference['end']) <= sample_tolerance
+    assert len(varying_detector.segments_from_percent(dense, 'smoke')) > 1
+
+
+@pytest.fixture
+def repeated_video(video, tmp_path):
+    """The synthetic video with each of its first 8 frames shown 3 times, losslessly encoded
+    so that the repeats are identical"""
+    import cv2
+
+    cap = cv2.VideoCapture(video)
+    frames = [cap.read()[1] for _ in range(8)]
+    cap.release()
+    path = str(tmp_path / 'repeated.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'FFV1'), 30, (160, 96))
+    if not writer.isOpened():
+        pytest.skip('OpenCV cannot write FFV1 videos')
+    for img0 in frames:
+        for _ in range(3):
+            writer.write(img0)
+    writer.release()
+    return path
+
+
+def test_gate_threshold_counts_in_scan_stats(varying_detector, repeated_video):
+    dense = varying_detector.percent_from_path(repeated_video)
+    assert varying_detector.scan_stats['gated'] == 0
+
+    varying_detector.gate_threshold = 0.3  # distinct frames differ by 0.6 or more
+    gated = varying_detector.percent_from_path(repeated_video)
+    stats = varying_detector.scan_stats
+    assert (stats['frames'], stats['inferred'], stats['gated']) == (24, 8, 16)
+    np.testing.assert_array_equal(gated, dense)
+
+    varying_detector.gate_threshold = 255
+    gated = varying_detector.percent_from_path(repeated_video)
+    stats = varying_detector.scan_stats
+    assert (stats['frames'], stats['inferred'], stats['gated']) == (24, 1, 23)
+    np.testing.assert_array_equal(gated, np.repeat(dense[:1], 24, axis=0))
+
+
+@pytest.mark.parametrize('pipeline_workers', [1, 4])
+def test_pipeline_keeps_frame_order(varying_detector, video, dense, pipeline_workers, monkeypatch):
+    import random
+    import time
+
+    from video_toolpkg import fire_smoke_detector
+
+    rng = random.Random(0)
+
+    def letterbox(*args, **kwargs):
+        time.sleep(rng.uniform(0, 0.01))  # frames finish preprocessing out of order
+        return letterbox_(*args, **kwargs)
+
+    letterbox_ = fire_smoke_detector.letterbox
+    monkeypatch.setattr(fire_smoke_detector, 'letterbox', letterbox)
+    varying_detector.pipeline_workers = pipeline_workers
+    varying_detector.batch_size = 3
+    np.testing.assert_array_equal(varying_detector.percent_from_path(video), dense)
+
+
+def test_sharded_scan_matches_dense_scan(varying_detector, video, dense):
+    varying_detector.shard_workers = 3
+    varying_detector.shard_threads = 1
+    np.testing.assert_array_equal(varying_detector.percent_from_path(video), dense)
+    assert varying_detector.scan_stats['frames'] == varying_detector.scan_stats['inferred'] == len(dense)
+
+
+def test_frames_not_escalated_are_zeros(varying_detector, varying_weights, video, dense):
+    varying_detector.screen_weights = varying_weights  # the model screens itself
+    varying_detector.screen_imgsz = 64
+    varying_detector.escalate_threshold = 70  # some frames reach it, others do not
+    percents = varying_detector.percent_from_path(video)
+    stats = varying_detector.scan_stats
+    assert stats['screened'] == len(dense) and 0 < stats['escalated'] < len(dense)
+
+    escalated = percents.any(axis=1)  # every frame of the dense scan has a nonzero percentage
+    assert dense.any(axis=1).all() and escalated.sum() == stats['escalated']
+    np.testing.assert_array_equal(percents[escalated], dense[escalated])